@@ -1,16 +1,42 @@
 # dashboard_freedom_radio_reunion_colombe.py
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import time
+import plotly.io as pio
 from datetime import datetime, timedelta
 import random
+import functools
+import html
+import json
+import os
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# Modèle de données (sans Streamlit), partagé avec le service HTTP freedom_api.py
+from freedom_audience import (
+    DEFAULT_TRACK_WINDOW,
+    FORECAST_HOURS,
+    STATIONS,
+    TRACK_WINDOWS,
+    AudienceModel,
+    AudienceStore,
+    PerfTimings,
+    build_perf_timings,
+    get_show_analytics,
+)
+from freedom_alerts import build_alert_engine
+from freedom_api import AudienceAPI
+from freedom_monitoring import build_tech_monitor
+
+try:  # orjson accélère la sérialisation des figures (tableaux NumPy passés tels quels)
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    pio.json.config.default_engine = 'orjson'
+
 # Configuration de la page
 st.set_page_config(
     page_title="Freedom Radio Réunion - Dashboard Temps Réel",
@@ -103,307 +129,194 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class FreedomRadioReunionDashboard:
-    def __init__(self, station_number=1):
-        self.station_number = station_number
-        self.current_time = datetime.now()
-        self.initialize_real_data()
-        
-    def initialize_real_data(self):
-        """Initialise les données réelles de Freedom Radio Réunion"""
-        
-        # Données historiques récentes (dernières 48h)
-        self.historical_data = self.generate_historical_data()
-        
-        # Données en temps réel basées sur les audiences réelles
-        if self.station_number == 1:
-            # Freedom 1 - audience plus large
-            self.live_data = {
-                'current_listeners': 85600,
-                'peak_today': 112000,
-                'trend': 'up',
-                'mobile_listeners': 68,
-                'car_listeners': 25,
-                'home_listeners': 7
-            }
-        else:
-            # Freedom 2 - audience plus jeune
-            self.live_data = {
-                'current_listeners': 72300,
-                'peak_today': 89000,
-                'trend': 'stable',
-                'mobile_listeners': 75,
-                'car_listeners': 18,
-                'home_listeners': 7
-            }
-        
-        # Programme actuel réel basé sur la grille des programmes
-        current_hour = datetime.now().hour
-        
-        if 6 <= current_hour < 9:
-            # Morning show
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'LE RÉVEIL FREEDOM',
-                    'host': 'JEAN-MARC ET LA TEAM',
-                    'start_time': '06:00',
-                    'end_time': '09:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 85
-                }
-            else:
-                self.current_show = {
-                    'name': 'FREEDOM 2 MATIN',
-                    'host': 'NADEGE ET GILLES',
-                    'start_time': '06:00',
-                    'end_time': '09:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 82
-                }
-                
-        elif 9 <= current_hour < 12:
-            # Late morning
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'FREEDOM ENTRE NOUS',
-                    'host': 'STEPHANIE',
-                    'start_time': '09:00',
-                    'end_time': '12:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 78
-                }
-            else:
-                self.current_show = {
-                    'name': 'HIT FREEDOM 2',
-                    'host': 'DAVID',
-                    'start_time': '09:00',
-                    'end_time': '12:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 80
-                }
-                
-        elif 12 <= current_hour < 15:
-            # Lunch time
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'LE FREEDOM DE 12H-15H',
-                    'host': 'DIDIER',
-                    'start_time': '12:00',
-                    'end_time': '15:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 76
-                }
-            else:
-                self.current_show = {
-                    'name': 'FREEDOM 2 ENTRE MIDI',
-                    'host': 'MARIE-LINE',
-                    'start_time': '12:00',
-                    'end_time': '15:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 74
-                }
-                
-        elif 15 <= current_hour < 18:
-            # Afternoon
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'DRIVE FREEDOM',
-                    'host': 'LAURENT',
-                    'start_time': '15:00',
-                    'end_time': '18:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 79
-                }
-            else:
-                self.current_show = {
-                    'name': 'FREEDOM 2 DRIVE',
-                    'host': 'KEVIN',
-                    'start_time': '15:00',
-                    'end_time': '18:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 81
-                }
-                
-        elif 18 <= current_hour < 21:
-            # Evening
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'FREEDOM NIGHT SHOW',
-                    'host': 'PATRICE',
-                    'start_time': '18:00',
-                    'end_time': '21:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 83
-                }
-            else:
-                self.current_show = {
-                    'name': 'FREEDOM 2 SOIR',
-                    'host': 'JOHAN',
-                    'start_time': '18:00',
-                    'end_time': '21:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 85
-                }
-                
+OVERVIEW_CHOICE = "Vue d'ensemble (Freedom 1 + 2)"
+
+# Périodes proposées pour le graphique d'évolution (None : dates personnalisées)
+CHART_RANGES = {
+    '1 h': timedelta(hours=1),
+    '6 h': timedelta(hours=6),
+    '24 h': timedelta(hours=24),
+    '7 j': timedelta(days=7),
+    '30 j': timedelta(days=30),
+    'Personnalisé': None
+}
+
+# Messages affichés dans le flux social
+SOCIAL_FEED_SIZE = 6
+
+def format_age(seconds):
+    """Ancienneté d'un message : « Maintenant », « 4 min », « 2 h », « 3 j »"""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "Maintenant"
+    if minutes < 60:
+        return f"{minutes} min"
+    if minutes < 24 * 60:
+        return f"{minutes // 60} h"
+    return f"{minutes // (24 * 60)} j"
+
+# Tendance d'un titre d'une fenêtre à l'autre (rang gagné, perdu, inchangé, nouvelle entrée)
+TRACK_TREND_ICONS = {'up': "🔺", 'down': "🔻", 'stable': "➡️", 'new': "🆕"}
+
+class FigureCache:
+    """Figures Plotly conservées d'un rendu à l'autre.
+
+    Une figure est construite une fois par clé (mise en page, template, axes) ;
+    les rendus suivants ne remplacent que les données des traces. La figure est
+    reconstruite quand sa « forme » change (`shape` : période, nombre de traces...).
+    """
+
+    def __init__(self):
+        self._figures = {}
+
+    def get(self, key, build, shape=None):
+        """Figure associée à `key`, construite par `build()` si absente ou si `shape` a changé"""
+        entry = self._figures.get(key)
+        if entry is None or entry[0] != shape:
+            entry = self._figures[key] = (shape, build())
+        return entry[1]
+
+    @staticmethod
+    def patch(fig, *traces, **layout):
+        """Remplace les propriétés des traces (un dict par trace, dans l'ordre) et de la mise en page"""
+        with fig.batch_update():
+            for trace, values in zip(fig.data, traces):
+                trace.update(values)
+            if layout:
+                fig.update_layout(layout)
+        return fig
+
+    def clear(self):
+        self._figures.clear()
+
+# Limites communales IGN (ADMIN EXPRESS) simplifiées, servies telles quelles au navigateur (dossier static/)
+COMMUNES_GEOJSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'communes-974.geojson')
+COMMUNES_GEOJSON_URL = 'app/static/communes-974.geojson'
+COMMUNES_MAX_VERTICES = 4000
+
+# Noms officiels (contours IGN / INSEE) -> noms utilisés par l'audience
+COMMUNE_ALIASES = {
+    "L'Étang-Salé": 'Étang-Salé',
+    'Les Trois-Bassins': 'Trois-Bassins',
+}
+
+def simplify_ring(points, tolerance):
+    """Douglas-Peucker itératif sur un anneau (tableau N x 2), extrémités conservées"""
+    if len(points) <= 4:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = end - start
+        inner = points[first + 1:last] - start
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
         else:
-            # Night/Automated
-            if self.station_number == 1:
-                self.current_show = {
-                    'name': 'FREEDOM NON STOP',
-                    'host': 'PLAYLIST AUTOMATISÉE',
-                    'start_time': '21:00',
-                    'end_time': '06:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 65
-                }
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+    simplified = points[keep]
+    # Un anneau doit garder au moins 4 points (3 sommets + fermeture)
+    return simplified if len(simplified) >= 4 else points[np.linspace(0, len(points) - 1, 4).astype(int)]
+
+def _geometry_rings(geometry):
+    """Anneaux d'une géométrie Polygon / MultiPolygon, sous forme de listes de polygones"""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f"Géométrie non supportée : {geometry['type']}")
+
+def simplify_geojson(geojson, max_vertices=COMMUNES_MAX_VERTICES, decimals=4):
+    """Simplifie toutes les géométries pour tenir dans un budget de sommets.
+
+    La tolérance Douglas-Peucker est cherchée par dichotomie ; les coordonnées
+    sont arrondies (4 décimales ≈ 10 m) pour alléger le JSON envoyé au navigateur.
+    """
+    polygons = [[[np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon]
+                 for polygon in _geometry_rings(feature['geometry'])]
+                for feature in geojson['features']]
+    
+    def simplified(tolerance):
+        return [[[simplify_ring(ring, tolerance) for ring in polygon] for polygon in feature]
+                for feature in polygons]
+    
+    def vertices(features):
+        return sum(len(ring) for feature in features for polygon in feature for ring in polygon)
+    
+    result = simplified(0.0)
+    if vertices(result) > max_vertices:
+        low, high = 0.0, 0.01
+        while vertices(simplified(high)) > max_vertices:
+            high *= 2
+        for _ in range(20):
+            middle = (low + high) / 2
+            if vertices(simplified(middle)) > max_vertices:
+                low = middle
             else:
-                self.current_show = {
-                    'name': 'FREEDOM 2 NON STOP',
-                    'host': 'PLAYLIST AUTOMATISÉE',
-                    'start_time': '21:00',
-                    'end_time': '06:00',
-                    'listeners': self.live_data['current_listeners'],
-                    'engagement': 68
-                }
+                high = middle
+        result = simplified(high)
+    
+    features = []
+    for feature, geometry in zip(geojson['features'], result):
+        coordinates = [[np.round(ring, decimals).tolist() for ring in polygon] for polygon in geometry]
+        features.append({
+            'type': 'Feature',
+            'id': feature.get('id'),
+            'properties': feature.get('properties', {}),
+            'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
 
-        # Top titres réels en cours (artistes populaires à La Réunion)
-        if self.station_number == 1:
-            self.top_tracks = [
-                {'artist': 'GABRIEL ZACCAI', 'title': 'LA RÉUNION', 'plays': 45, 'trend': 'up'},
-                {'artist': 'KAF MARON', 'title': 'MARMITE', 'plays': 42, 'trend': 'stable'},
-                {'artist': 'DANYÈL WARO', 'title': 'SOMMIN KARÉ', 'plays': 38, 'trend': 'up'},
-                {'artist': 'ZISKAKAN', 'title': 'BOUT D\'MON ÎLE', 'plays': 35, 'trend': 'down'},
-                {'artist': 'NATHALIE NATIEMBÉ', 'title': 'KASKAS NOU LA', 'plays': 32, 'trend': 'up'},
-                {'artist': 'BASTERS', 'title': 'MAMY LAO', 'plays': 30, 'trend': 'up'},
-                {'artist': 'GRUP LÉLÉ', 'title': 'SÉGA TROIS FLEURS', 'plays': 28, 'trend': 'stable'},
-                {'artist': 'LOÏC BENJAMIN', 'title': 'DANMON LÉVÉ', 'plays': 25, 'trend': 'up'}
-            ]
-        else:
-            # Freedom 2 - plus de variété internationale
-            self.top_tracks = [
-                {'artist': 'DAVID GUETTA', 'title': 'I\'M GOOD', 'plays': 48, 'trend': 'up'},
-                {'artist': 'MILEY CYRUS', 'title': 'FLOWERS', 'plays': 42, 'trend': 'stable'},
-                {'artist': 'SIA', 'title': 'UNSTOPPABLE', 'plays': 39, 'trend': 'up'},
-                {'artist': 'THE WEEKND', 'title': 'BLINDING LIGHTS', 'plays': 36, 'trend': 'down'},
-                {'artist': 'DUA LIPA', 'title': 'DANCE THE NIGHT', 'plays': 34, 'trend': 'up'},
-                {'artist': 'ED SHEERAN', 'title': 'EYES CLOSED', 'plays': 31, 'trend': 'up'},
-                {'artist': 'KAF MARON', 'title': 'LA ROUTE DU BONHEUR', 'plays': 28, 'trend': 'stable'},
-                {'artist': 'GABRIEL ZACCAI', 'title': 'MON ÎLE ADORÉE', 'plays': 26, 'trend': 'up'}
-            ]
-        
-        # Données géographiques réelles (estimation par communes)
-        self.geo_data = {
-            'Saint-Denis': 21500,
-            'Saint-Pierre': 18200,
-            'Saint-Paul': 15600,
-            'Le Tampon': 14200,
-            'Saint-Louis': 9800,
-            'Le Port': 8600,
-            'Saint-Joseph': 7200,
-            'Saint-André': 6800,
-            'Saint-Benoît': 6100,
-            'Bras-Panon': 3800,
-            'Saint-Philippe': 2900,
-            'Sainte-Marie': 5200,
-            'Sainte-Suzanne': 4800,
-            'Sainte-Rose': 3200,
-            'Les Avirons': 4100,
-            'Entre-Deux': 3500,
-            'Étang-Salé': 3900,
-            'Petite-Île': 3400,
-            'La Possession': 7500,
-            'Salazie': 1800,
-            'Cilaos': 1600,
-            'Trois-Bassins': 2700
-        }
-
-    def generate_historical_data(self):
-        """Génère des données historiques réalistes pour les dernières 48 heures"""
-        end_time = datetime.now()
-        start_time = end_time - timedelta(hours=48)
-        
-        data = []
-        current_time = start_time
-        
-        while current_time <= end_time:
-            # Variation circadienne réaliste pour La Réunion
-            hour = current_time.hour
-            if 6 <= hour <= 9:  # Morning show - pic d'audience
-                base_listeners = 85000 + random.randint(-8000, 15000)
-            elif 16 <= hour <= 19:  # Afternoon/evening - retour travail/école
-                base_listeners = 78000 + random.randint(-6000, 10000)
-            elif 20 <= hour <= 23:  # Prime time - soirée
-                base_listeners = 92000 + random.randint(-10000, 18000)
-            elif 0 <= hour <= 5:  # Night - audience réduite
-                base_listeners = 25000 + random.randint(-5000, 8000)
-            else:  # Day time
-                base_listeners = 65000 + random.randint(-5000, 7000)
-            
-            # Ajustement selon la station
-            if self.station_number == 2:
-                base_listeners = int(base_listeners * 0.85)  # Freedom 2 légèrement moins d'audience
-            
-            # Bruit aléatoire
-            listeners = max(base_listeners + random.randint(-3000, 3000), 15000)
-            
-            data.append({
-                'timestamp': current_time,
-                'listeners': listeners,
-                'hour': hour,
-                'mobile_percent': random.randint(65, 75),
-                'engagement': random.randint(70, 88)
-            })
-            
-            current_time += timedelta(minutes=10)  # Point toutes les 10 minutes
-        
-        return pd.DataFrame(data)
-
-    def update_live_data(self):
-        """Met à jour les données en temps réel avec des variations réalistes"""
-        # Variation basée sur l'heure actuelle
-        current_hour = datetime.now().hour
-        
-        # Facteur saisonnier basé sur l'heure
-        if 6 <= current_hour <= 9:  # Morning peak
-            base_factor = 1.0
-            volatility = 0.06
-        elif 16 <= current_hour <= 19:  # Evening commute
-            base_factor = 0.95
-            volatility = 0.05
-        elif 20 <= current_hour <= 23:  # Prime time
-            base_factor = 1.08
-            volatility = 0.07
-        elif 0 <= current_hour <= 5:  # Night
-            base_factor = 0.35
-            volatility = 0.08
-        else:  # Day time
-            base_factor = 0.85
-            volatility = 0.04
-        
-        # Mise à jour des auditeurs
-        current_listeners = self.live_data['current_listeners']
-        change = random.randint(-int(current_listeners * volatility), int(current_listeners * volatility))
-        new_listeners = max(int(current_listeners * base_factor + change), 15000)
-        
-        self.live_data['current_listeners'] = new_listeners
-        
-        # Mise à jour du pic
-        if new_listeners > self.live_data['peak_today']:
-            self.live_data['peak_today'] = new_listeners
-        
-        # Mise à jour de la tendance
-        if change > 500:
-            self.live_data['trend'] = 'up'
-        elif change < -500:
-            self.live_data['trend'] = 'down'
-        else:
-            self.live_data['trend'] = 'stable'
-        
-        # Mise à jour des données géographiques (légères variations)
-        for ville in self.geo_data:
-            current = self.geo_data[ville]
-            variation = random.randint(-int(current * 0.05), int(current * 0.05))
-            self.geo_data[ville] = max(current + variation, 500)
+def load_commune_geometry(path, max_vertices=COMMUNES_MAX_VERTICES):
+    """Lit le GeoJSON des communes, le simplifie et identifie chaque contour par son nom d'audience"""
+    with open(path, encoding='utf-8') as handle:
+        geojson = json.load(handle)
+    for feature in geojson['features']:
+        properties = feature.get('properties', {})
+        name = properties.get('nom') or properties.get('name') or properties.get('NOM')
+        feature['id'] = COMMUNE_ALIASES.get(name, name)
+    return simplify_geojson(geojson, max_vertices)
+
+@st.cache_resource
+def get_commune_geometry(path=None):
+    """Contours des communes, chargés une seule fois par processus (None si absents).
+
+    Renvoie {'ids': identifiants des contours, 'geojson': contours ou URL}.
+    Les contours livrés sont déjà simplifiés : avec le service de fichiers
+    statiques de Streamlit (.streamlit/config.toml), le navigateur les
+    télécharge une fois par URL et les figures ne transportent que les
+    couleurs. Un fichier indiqué par FREEDOM_COMMUNES_GEOJSON est simplifié
+    et intégré à la figure.
+    """
+    path = path or os.environ.get('FREEDOM_COMMUNES_GEOJSON', COMMUNES_GEOJSON_PATH)
+    if not os.path.exists(path):
+        return None
+    geometry = load_commune_geometry(path)
+    ids = [feature['id'] for feature in geometry['features']]
+    if path == COMMUNES_GEOJSON_PATH and st.get_option('server.enableStaticServing'):
+        return {'ids': ids, 'geojson': COMMUNES_GEOJSON_URL}
+    return {'ids': ids, 'geojson': geometry}
+
+class FreedomRadioReunionDashboard(AudienceModel):
+    def __init__(self, station_number=1, history_hours=48, resolution_minutes=10, seed=None, store=None,
+                 history_store=None, perf=None, monitor=None, alerts=None):
+        super().__init__(station_number, history_hours, resolution_minutes, seed, store, history_store)
+        self.refresh_rate = 30
+        self.figures = FigureCache()
+        self.perf = perf or PerfTimings()
+        self.monitor = monitor
+        self.alerts = alerts
 
     def display_live_header(self):
         """Affiche l'en-tête en temps réel avec la colombe"""
@@ -426,10 +339,14 @@ class FreedomRadioReunionDashboard:
                        unsafe_allow_html=True)
         
         with col3:
-            current_time = datetime.now().strftime('%H:%M:%S')
-            st.markdown(f"**🕐 {current_time}**")
-            st.markdown(f"**📅 {datetime.now().strftime('%d/%m/%Y')}**")
-            st.markdown(f"**🏝️ Saint-Denis, La Réunion**")
+            self.live_fragment(self.display_clock)()
+
+    def display_clock(self):
+        """Affiche l'heure et la date courantes"""
+        current_time = datetime.now().strftime('%H:%M:%S')
+        st.markdown(f"**🕐 {current_time}**")
+        st.markdown(f"**📅 {datetime.now().strftime('%d/%m/%Y')}**")
+        st.markdown(f"**🏝️ Saint-Denis, La Réunion**")
 
     def display_reunion_flag(self):
         """Affiche le drapeau de La Réunion"""
@@ -463,7 +380,7 @@ class FreedomRadioReunionDashboard:
         
         with col1:
             trend_icon = "📈" if self.live_data['trend'] == 'up' else "📉" if self.live_data['trend'] == 'down' else "➡️"
-            delta_value = random.randint(-800, 800)
+            delta_value = self.live_data['last_change']
             st.metric(
                 label=f"AUDITEURS ACTUELS {trend_icon}",
                 value=f"{self.live_data['current_listeners']:,}".replace(',', ' '),
@@ -506,45 +423,137 @@ class FreedomRadioReunionDashboard:
         """Crée les graphiques en temps réel"""
         tab1, tab2, tab3 = st.tabs(["📈 Évolution Temps Réel", "🗺️ Audience Communes", "🎵 Programme Actuel"])
         
-        with tab1:
+        with tab1, self.perf.section('create_realtime_chart'):
             self.create_realtime_chart()
         
-        with tab2:
+        with tab2, self.perf.section('create_geographic_chart'):
             self.create_geographic_chart()
         
-        with tab3:
+        with tab3, self.perf.section('create_current_show_dashboard'):
             self.create_current_show_dashboard()
 
+    def select_chart_range(self):
+        """Sélecteur de période du graphique : (début, fin ou None pour maintenant, libellé)"""
+        choice = st.radio(
+            "Période",
+            list(CHART_RANGES),
+            index=1,
+            horizontal=True,
+            key=f"chart_range_{self.station_number}"
+        )
+        if CHART_RANGES[choice] is not None:
+            return datetime.now() - CHART_RANGES[choice], None, f"dernières {choice}"
+        
+        today = datetime.now().date()
+        default_dates = (today - timedelta(days=7), today)
+        dates = st.date_input(
+            "Dates",
+            value=default_dates,
+            max_value=today,
+            key=f"chart_dates_{self.station_number}"
+        )
+        # Plage vidée en cours de saisie : période par défaut ; une seule date : ce jour-là
+        if not dates:
+            dates = default_dates
+        elif len(dates) != 2:
+            dates = (dates[0], dates[0])
+        start = datetime.combine(dates[0], datetime.min.time())
+        end = datetime.combine(dates[1] + timedelta(days=1), datetime.min.time())
+        if end > datetime.now():
+            end = None
+        return start, end, f"du {dates[0]:%d/%m} au {dates[1]:%d/%m}"
+
     def create_realtime_chart(self):
         """Graphique d'évolution en temps réel"""
-        # Données des dernières 6 heures
-        six_hours_ago = datetime.now() - timedelta(hours=6)
-        recent_data = self.historical_data[self.historical_data['timestamp'] >= six_hours_ago].copy()
-        
-        # Ajouter le point actuel
-        current_point = {
-            'timestamp': datetime.now(),
-            'listeners': self.live_data['current_listeners'],
-            'hour': datetime.now().hour,
-            'mobile_percent': self.live_data['mobile_listeners'],
-            'engagement': self.current_show['engagement']
-        }
-        recent_data = pd.concat([recent_data, pd.DataFrame([current_point])], ignore_index=True)
-        
-        # Créer le graphique
+        if st.toggle("Sous-échantillonnage LTTB", key=f"lttb_{self.station_number}"):
+            self.downsampling = 'lttb'
+        else:
+            self.downsampling = 'rollup'
+        
+        # Période affichée, dans la limite du budget de points
+        start, end, range_label = self.select_chart_range()
+        recent_history = self.chart_series(start, end)
+        
+        # Ajouter le point actuel pour les périodes qui se terminent maintenant
+        if end is None:
+            current_listeners = self.live_data['current_listeners']
+            recent_data = {
+                'timestamp': np.append(recent_history['timestamp'], np.datetime64(datetime.now(), 'ns')),
+                'listeners': np.append(recent_history['listeners'], current_listeners),
+                'engagement': np.append(recent_history['engagement'], self.current_show['engagement'])
+            }
+            band_end = [current_listeners]
+        else:
+            recent_data = recent_history
+            band_end = []
+        
+        # Prévision sur un quart de la période affichée (6 h au plus) : l'historique garde l'essentiel de l'axe
+        forecast = self.forecast if end is None else None
+        if forecast is not None:
+            horizon = min(timedelta(hours=FORECAST_HOURS), (datetime.now() - start) / 4)
+            visible = forecast['timestamp'] <= np.datetime64(datetime.now() + horizon, 'ns')
+            forecast = {name: values[visible] for name, values in forecast.items()}
+        
+        # Figure construite une fois par période ; seules les séries sont remplacées ensuite
+        has_band = 'listeners_min' in recent_history
+        fig = self.figures.get(
+            'realtime',
+            lambda: self.build_realtime_figure(range_label, has_band, forecast is not None),
+            shape=(range_label, has_band, forecast is not None)
+        )
+        traces = []
+        if has_band:
+            traces.append(dict(x=recent_data['timestamp'], y=np.append(recent_history['listeners_max'], band_end)))
+            traces.append(dict(x=recent_data['timestamp'], y=np.append(recent_history['listeners_min'], band_end)))
+        traces.append(dict(
+            x=recent_data['timestamp'],
+            y=recent_data['listeners'],
+            mode='lines+markers' if len(recent_data['listeners']) <= 100 else 'lines'
+        ))
+        if forecast is not None:
+            traces.append(dict(x=forecast['timestamp'], y=forecast['upper']))
+            traces.append(dict(x=forecast['timestamp'], y=forecast['lower']))
+            traces.append(dict(x=forecast['timestamp'], y=forecast['mean']))
+        traces.append(dict(x=recent_data['timestamp'], y=recent_data['engagement']))
+        self.figures.patch(fig, *traces)
+        
+        st.plotly_chart(fig, use_container_width=True)
+
+    def build_realtime_figure(self, range_label, has_band, has_forecast=False):
+        """Mise en page et traces (vides) du graphique temps réel"""
         fig = make_subplots(
             rows=2, cols=1,
-            subplot_titles=(f'Évolution des Auditeurs Freedom {self.station_number} (6 dernières heures)', 'Taux d\'Engagement'),
+            subplot_titles=(f'Évolution des Auditeurs Freedom {self.station_number} ({range_label})', 'Taux d\'Engagement'),
             vertical_spacing=0.1,
             row_heights=[0.7, 0.3]
         )
         
+        # Bande min/max quand les données sont agrégées
+        if has_band:
+            fig.add_trace(
+                go.Scatter(
+                    mode='lines',
+                    line=dict(width=0),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ),
+                row=1, col=1
+            )
+            fig.add_trace(
+                go.Scatter(
+                    mode='lines',
+                    name='Min - Max',
+                    line=dict(width=0),
+                    fill='tonexty',
+                    fillcolor='rgba(255, 0, 0, 0.15)',
+                    hoverinfo='skip'
+                ),
+                row=1, col=1
+            )
+        
         # Graphique des auditeurs
         fig.add_trace(
             go.Scatter(
-                x=recent_data['timestamp'],
-                y=recent_data['listeners'],
-                mode='lines+markers',
                 name='Auditeurs',
                 line=dict(color='#FF0000', width=3),
                 marker=dict(size=4)
@@ -552,11 +561,40 @@ class FreedomRadioReunionDashboard:
             row=1, col=1
         )
         
+        # Prévision des prochaines heures et sa bande d'incertitude
+        if has_forecast:
+            fig.add_trace(
+                go.Scatter(
+                    mode='lines',
+                    line=dict(width=0),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ),
+                row=1, col=1
+            )
+            fig.add_trace(
+                go.Scatter(
+                    mode='lines',
+                    name='Intervalle de prévision',
+                    line=dict(width=0),
+                    fill='tonexty',
+                    fillcolor='rgba(255, 140, 0, 0.2)',
+                    hoverinfo='skip'
+                ),
+                row=1, col=1
+            )
+            fig.add_trace(
+                go.Scatter(
+                    mode='lines',
+                    name='Prévision',
+                    line=dict(color='#FF8C00', width=2, dash='dash')
+                ),
+                row=1, col=1
+            )
+        
         # Graphique d'engagement
         fig.add_trace(
             go.Scatter(
-                x=recent_data['timestamp'],
-                y=recent_data['engagement'],
                 mode='lines',
                 name='Engagement',
                 line=dict(color='#0000FF', width=2),
@@ -569,49 +607,37 @@ class FreedomRadioReunionDashboard:
         fig.update_layout(
             height=500,
             showlegend=True,
-            hovermode='x unified'
+            hovermode='x unified',
+            # Garde le zoom de l'utilisateur entre deux rafraîchissements
+            uirevision=f"{self.station_number}-{range_label}"
         )
         
         fig.update_xaxes(title_text="Heure", row=2, col=1)
         fig.update_yaxes(title_text="Auditeurs", row=1, col=1)
         fig.update_yaxes(title_text="Engagement (%)", range=[60, 100], row=2, col=1)
-        
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
     def create_geographic_chart(self):
         """Carte de l'audience par communes"""
+        if not self.geo_measured:
+            st.caption("⚠️ Répartition par commune simulée : aucune source ne localise les auditeurs "
+                       "(log de sessions ou d'accès avec FREEDOM_IP_RANGES).")
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Préparation des données pour les communes
-            communes_data = {
-                'Commune': list(self.geo_data.keys()),
-                'Auditeurs': list(self.geo_data.values()),
-                'Part (%)': [round((count / sum(self.geo_data.values())) * 100, 1) for count in self.geo_data.values()]
-            }
-            
-            df_communes = pd.DataFrame(communes_data)
-            
-            # Graphique à barres pour les communes
-            fig = px.bar(
-                df_communes.sort_values('Auditeurs', ascending=True),
-                x='Auditeurs',
-                y='Commune',
-                orientation='h',
-                color='Auditeurs',
-                color_continuous_scale='Reds',
-                title=f"Audience par Commune - Freedom {self.station_number}"
-            )
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            geometry = get_commune_geometry()
+            view = 'Barres'
+            if geometry is not None:
+                view = st.radio("Vue", ['Carte', 'Barres'], horizontal=True,
+                                key=f"geo_view_{self.station_number}", label_visibility='collapsed')
+            if view == 'Carte':
+                st.plotly_chart(self.commune_map_figure(geometry), use_container_width=True)
+            else:
+                self.create_commune_bars()
         
         with col2:
             st.subheader("🏆 Top 5 Communes")
-            top_communes = sorted(self.geo_data.items(), key=lambda x: x[1], reverse=True)[:5]
-            
-            for i, (commune, count) in enumerate(top_communes, 1):
-                percentage = (count / sum(self.geo_data.values())) * 100
+            for i, (commune, count, percentage) in enumerate(self.geo_data.top(5), 1):
                 st.markdown(f"""
                 <div class="metric-card">
                     <h4>#{i} {commune}</h4>
@@ -628,13 +654,69 @@ class FreedomRadioReunionDashboard:
                 'Domicile': self.live_data['home_listeners']
             }
             
-            fig_pie = px.pie(
-                values=list(listen_types.values()),
-                names=list(listen_types.keys()),
-                color_discrete_sequence=['#FF0000', '#0000FF', '#808080']
-            )
-            fig_pie.update_layout(height=250)
+            fig_pie = self.figures.get('listen_types', lambda: go.Figure(
+                go.Pie(
+                    labels=list(listen_types.keys()),
+                    marker_colors=['#FF0000', '#0000FF', '#808080']
+                ),
+                layout=dict(height=250)
+            ))
+            self.figures.patch(fig_pie, dict(values=list(listen_types.values())))
             st.plotly_chart(fig_pie, use_container_width=True)
+    
+    def create_commune_bars(self):
+        """Graphique à barres de l'audience par commune"""
+        # Communes par audience croissante (ordre déjà calculé à la mise à jour)
+        ascending = self.geo_data.order[::-1]
+        counts = self.geo_data.counts[ascending]
+        
+        fig = self.figures.get('commune_bars', lambda: go.Figure(
+            go.Bar(
+                orientation='h',
+                marker=dict(colorscale='Reds', showscale=True, colorbar=dict(title='Auditeurs')),
+                hovertemplate='%{y}<br>%{x:,} auditeurs<extra></extra>'
+            ),
+            layout=dict(
+                title=f"Audience par Commune - Freedom {self.station_number}",
+                xaxis_title='Auditeurs',
+                yaxis_title='Commune',
+                height=500
+            )
+        ))
+        self.figures.patch(fig, dict(x=counts, y=np.asarray(self.geo_data.names)[ascending], marker_color=counts))
+        st.plotly_chart(fig, use_container_width=True)
+    
+    def commune_map_figure(self, geometry):
+        """Choroplèthe des communes : la géométrie est posée une fois, seules les couleurs changent.
+
+        À chaque rafraîchissement on ne remplace que le vecteur `z` de
+        l'unique trace, sans revalider les contours. Les communes sans données
+        (NaN) ne sont pas coloriées.
+        """
+        fig = self.figures.get('communes', lambda: self.build_commune_map(geometry), shape=id(geometry))
+        positions = self.geo_data.positions
+        z = np.array([self.geo_data.counts[positions[name]] if name in positions else np.nan
+                      for name in geometry['ids']], dtype=np.float64)
+        return self.figures.patch(fig, dict(z=z))
+    
+    def build_commune_map(self, geometry):
+        """Trace d'audience sur tous les contours (couleurs remplies au rendu)"""
+        fig = go.Figure(go.Choropleth(
+            geojson=geometry['geojson'],
+            locations=geometry['ids'],
+            colorscale='Reds',
+            colorbar_title='Auditeurs',
+            hovertemplate='%{location}<br>%{z:,} auditeurs<extra></extra>',
+            marker_line_color='white'
+        ))
+        fig.update_geos(fitbounds='locations', visible=False)
+        fig.update_layout(
+            height=500,
+            margin=dict(l=0, r=0, t=40, b=0),
+            title=f"Audience par Commune - Freedom {self.station_number}",
+            uirevision=f"communes-{self.station_number}"
+        )
+        return fig
 
     def create_current_show_dashboard(self):
         """Dashboard de l'émission en cours"""
@@ -651,37 +733,22 @@ class FreedomRadioReunionDashboard:
             </div>
             """, unsafe_allow_html=True)
             
-            # Graphique d'engagement de l'émission
-            engagement_data = []
-            show_start = datetime.now().replace(hour=int(self.current_show['start_time'].split(':')[0]), 
-                                              minute=0, second=0, microsecond=0)
-            
-            for i in range(8):  # 8 segments de 15-30 minutes
-                time_point = show_start + timedelta(minutes=i*30)
-                engagement = self.current_show['engagement'] + random.randint(-8, 8)
-                engagement = max(60, min(95, engagement))
-                engagement_data.append({'time': time_point, 'engagement': engagement})
-            
-            df_engagement = pd.DataFrame(engagement_data)
-            
-            fig = px.area(df_engagement, x='time', y='engagement',
-                         title="Engagement pendant l'émission",
-                         labels={'engagement': 'Taux d\'Engagement (%)', 'time': 'Heure'})
-            
-            fig.update_traces(fillcolor='rgba(255, 0, 0, 0.3)', line_color='#FF0000')
-            fig.update_layout(height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            self.create_show_analytics()
         
         with col2:
             st.subheader("🎵 TOP 8 EN COURS")
+            window = st.radio(
+                "Période", list(TRACK_WINDOWS), index=list(TRACK_WINDOWS).index(DEFAULT_TRACK_WINDOW),
+                horizontal=True, key=f"top_window_{self.station_number}", label_visibility="collapsed"
+            )
             
-            for i, track in enumerate(self.top_tracks[:8], 1):
-                trend_icon = "🔺" if track['trend'] == 'up' else "🔻" if track['trend'] == 'down' else "➡️"
+            for track in self.top_tracks_by_window[window]:
+                trend_icon = TRACK_TREND_ICONS[track['trend']]
                 st.markdown(f"""
                 <div style="background: rgba(255,0,0,0.1); padding: 0.8rem; border-radius: 10px; margin: 0.5rem 0;">
-                    <strong>#{i} {trend_icon}</strong><br>
-                    <strong>{track['artist']}</strong><br>
-                    <small>{track['title']}</small><br>
+                    <strong>#{track['rank']} {trend_icon}</strong><br>
+                    <strong>{html.escape(track['artist'])}</strong><br>
+                    <small>{html.escape(track['title'])}</small><br>
                     <small>📻 {track['plays']} diffusions</small>
                 </div>
                 """, unsafe_allow_html=True)
@@ -698,167 +765,423 @@ class FreedomRadioReunionDashboard:
             for platform, count in social_metrics.items():
                 st.metric(label=platform, value=count)
 
+    def create_show_analytics(self):
+        """Audience de l'émission en cours calculée sur l'historique"""
+        weeks = 4
+        now = datetime.now()
+        history = self.history_range(now - timedelta(weeks=weeks))
+        report = get_show_analytics().report(
+            self.station_number, history, now, weeks=weeks,
+            version=(id(self.history.timestamps), self.history.count)
+        )
+        
+        current = report['current']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            value = f"{current['avg_listeners']:,.0f}".replace(',', ' ') if current is not None else "-"
+            st.metric("MOYENNE ÉMISSION", value)
+        with col2:
+            value = f"{current['peak_listeners']:,.0f}".replace(',', ' ') if current is not None else "-"
+            st.metric("PIC ÉMISSION", value)
+        with col3:
+            value = f"{current['avg_engagement']:.0f}%" if current is not None else "-"
+            st.metric("ENGAGEMENT MOYEN", value)
+        
+        # Courbe d'audience pendant l'émission, comparée à la moyenne des diffusions précédentes
+        fig = self.figures.get('retention', lambda: go.Figure(
+            [
+                go.Scatter(mode='lines', name=f'Moyenne {weeks} semaines',
+                           line=dict(color='#0000FF', width=2, dash='dot')),
+                go.Scatter(mode='lines', name="Aujourd'hui",
+                           line=dict(color='#FF0000', width=3),
+                           fill='tozeroy', fillcolor='rgba(255, 0, 0, 0.3)')
+            ],
+            layout=dict(
+                title="Rétention pendant l'émission (% de l'audience de début)",
+                xaxis_title="Minutes depuis le début",
+                yaxis_title="Rétention (%)",
+                height=300
+            )
+        ), shape=weeks)
+        self.figures.patch(
+            fig,
+            dict(x=report['average_curve'][0], y=report['average_curve'][1]),
+            dict(x=report['current_curve'][0], y=report['current_curve'][1])
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Comparaison d'une semaine à l'autre
+        weekly = report['weekly']
+        if len(weekly):
+            fig = self.figures.get('weekly', lambda: go.Figure(
+                go.Bar(marker_color='#FF0000', name='Moyenne'),
+                layout=dict(title=f"Audience moyenne par semaine ({weeks} dernières semaines)", height=250)
+            ), shape=weeks)
+            self.figures.patch(fig, dict(
+                x=[f"Sem. du {week:%d/%m}" for week in weekly.index],
+                y=weekly['avg_listeners'].to_numpy()
+            ))
+            st.plotly_chart(fig, use_container_width=True)
+
     def create_social_feed(self):
-        """Flux social en temps réel avec contenu réunionnais"""
-        st.markdown('<h3 class="section-header">💬 FLUX SOCIAL LIVE RÉUNION</h3>', unsafe_allow_html=True)
-        
-        # Messages simulés avec contenu local
-        messages = [
-            {"user": "Marie_StDenis", "message": "Le Réveil Freedom meilleur réveil de l'île ! 🌅 #FreedomReunion", "time": "2 min", "likes": 42},
-            {"user": "Kevin974", "message": "En écoutant Freedom dans les bouchons vers St-Pierre 🚗🎵", "time": "4 min", "likes": 38},
-            {"user": "Sarah_Tampon", "message": "Qui va au concert de Kaf Maron ce week-end ? 🙋‍♀️", "time": "7 min", "likes": 29},
-            {"user": "Zoreil974", "message": "Découvert Gabriel Zaccai grâce à Freedom, quelle voix ! 🎤", "time": "12 min", "likes": 51},
-            {"user": "Reunion_Addict", "message": "Le son de Baster passe trop en ce moment sur Freedom !", "time": "15 min", "likes": 33},
-            {"user": "Metro_Lontan", "message": "Freedom, la seule radio qui parle vraiment à tous les réunionnais 💙", "time": "18 min", "likes": 47}
-        ]
-        
-        # Ajouter un nouveau message aléatoire
-        if random.random() > 0.7:
-            new_users = ["Ti_Creole", "Fan_De_Maloya", "StPierre_Radio", "Freedom4Ever", "Reunion_Sega"]
-            new_messages = [
-                "La playlist de ce matin est trop bien ! 🎧",
-                "Jean-Marc trop drôle dans le Réveil Freedom 😂",
-                "Qui écoute Freedom au boulot ? 👷‍♀️",
-                "Freedom devrait organiser un concert à Cilaos ! 🎤",
-                "Le maloya de Danyèl Waro, quel chef-d'œuvre 🎶"
-            ]
-            
-            messages.insert(0, {
-                "user": random.choice(new_users),
-                "message": random.choice(new_messages),
-                "time": "Maintenant",
-                "likes": random.randint(15, 45)
-            })
-        
-        # Afficher le flux
-        for msg in messages[:6]:  # Afficher les 6 premiers messages
-            with st.container():
-                col1, col2 = st.columns([4, 1])
-                
-                with col1:
-                    st.markdown(f"""
-                    **{msg['user']}** · {msg['time']}  
-                    {msg['message']}  
-                    ❤️ {msg['likes']}
-                    """)
-                
-                with col2:
-                    if st.button("❤️", key=f"{msg['user']}_{random.randint(1000,9999)}"):
-                        msg['likes'] += 1
-                        st.rerun()
-                
-                st.markdown("---")
+        """Flux social en temps réel : messages en un seul bloc, « j'aime » par un unique widget"""
+        messages = self.social_feed.recent(SOCIAL_FEED_SIZE)
+        now = time.time()
+        items = "".join(
+            f"""<div style="padding: 0.6rem 0; border-bottom: 1px solid rgba(128,128,128,0.3);">
+            <strong>{html.escape(message['user'])}</strong> · {format_age(now - message['timestamp'])}<br>
+            {html.escape(message['message'])}<br>
+            ❤️ {message['likes']}
+            </div>"""
+            for message in messages
+        )
+        st.markdown(
+            f'<h3 class="section-header">💬 FLUX SOCIAL LIVE RÉUNION</h3>{items}', unsafe_allow_html=True
+        )
+        
+        # Clé stable : le widget garde son identité d'un rendu à l'autre, le clic ne relance que le fragment
+        liked = st.session_state.setdefault('social_liked', set())
+        users = {message['id']: message['user'] for message in messages}
+        key = f"social_like_{self.station_number}"
+        st.pills(
+            "J'aime", list(users), selection_mode="single", key=key, label_visibility="collapsed",
+            format_func=lambda message_id: f"{'❤️' if message_id in liked else '🤍'} {users[message_id]}",
+            on_change=self.like_message, args=(key,)
+        )
+
+    def like_message(self, key):
+        """Compte le « j'aime » choisi (une fois par session et par message) puis libère la sélection"""
+        message_id = st.session_state[key]
+        st.session_state[key] = None
+        liked = st.session_state.setdefault('social_liked', set())
+        if message_id is not None and message_id not in liked and self.social_feed.like(message_id):
+            liked.add(message_id)
 
     def create_technical_monitoring(self):
-        """Monitoring technique en temps réel"""
+        """Monitoring technique : dernier échantillon du collecteur partagé"""
         st.markdown('<h3 class="section-header">⚙️ MONITORING TECHNIQUE FREEDOM</h3>', unsafe_allow_html=True)
         
+        previous, latest = self.monitor.samples if self.monitor is not None else (None, None)
+        latest = latest or {}
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            # Qualité du stream
-            stream_quality = random.randint(97, 100)
+            # Qualité du stream (points de montage en ligne)
+            stream_quality = latest.get('stream_quality', np.nan)
             st.metric(
                 label="QUALITÉ STREAM",
-                value=f"{stream_quality}%",
+                value=f"{stream_quality:.0f}%" if np.isfinite(stream_quality) else "-",
                 delta=None
             )
-            st.progress(stream_quality / 100)
+            st.progress(stream_quality / 100 if np.isfinite(stream_quality) else 0.0)
         
         with col2:
-            # Latence
-            latency = random.randint(40, 120)
-            status = "🟢 Bon" if latency < 80 else "🟡 Moyen" if latency < 110 else "🔴 Élevé"
+            # Latence moyenne des émetteurs sondés
+            latency = latest.get('latency_ms', np.nan)
+            if np.isfinite(latency):
+                status = "🟢 Bon" if latency < 80 else "🟡 Moyen" if latency < 110 else "🔴 Élevé"
+            else:
+                status = None
             st.metric(
                 label="LATENCE MOYENNE",
-                value=f"{latency}ms",
+                value=f"{latency:.0f}ms" if np.isfinite(latency) else "-",
                 delta=status
             )
         
         with col3:
             # Émetteurs
-            emetteurs_online = 12
+            total = latest.get('transmitters_total', 0)
             st.metric(
                 label="ÉMETTEURS ACTIFS",
-                value=f"{emetteurs_online}/12",
-                delta=None
+                value=f"{latest.get('transmitters_up', 0)}/{total}" if total else "-",
+                delta=None,
+                help=", ".join(transmitter['name'] for transmitter in latest.get('transmitters', ()) if not transmitter['ok'])
+                or None
             )
         
         with col4:
-            # Bandwidth
-            bandwidth = random.randint(150, 300)
+            # Débit réseau sortant de la machine
+            bandwidth = latest.get('network_mbps', np.nan)
             st.metric(
                 label="BANDE PASSANTE",
-                value=f"{bandwidth} Mbps",
+                value=f"{bandwidth:.1f} Mbps" if np.isfinite(bandwidth) else "-",
                 delta=None
             )
         
-        # Graphique de charge serveur
-        server_load = [random.randint(35, 75) for _ in range(10)]
-        fig = go.Figure(go.Indicator(
-            mode = "gauge+number+delta",
-            value = server_load[-1],
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "CHARGE SERVEUR FREEDOM"},
-            delta = {'reference': server_load[-2]},
-            gauge = {
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "#FF0000"},
-                'steps': [
-                    {'range': [0, 50], 'color': "lightgray"},
-                    {'range': [50, 80], 'color': "yellow"},
-                    {'range': [80, 100], 'color': "red"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 85
+        # Charge CPU, comparée à l'échantillon précédent
+        server_load = latest.get('cpu_percent', np.nan)
+        reference = (previous or {}).get('cpu_percent', server_load)
+        fig = self.figures.get('server_load', lambda: go.Figure(
+            go.Indicator(
+                mode = "gauge+number+delta",
+                domain = {'x': [0, 1], 'y': [0, 1]},
+                title = {'text': "CHARGE SERVEUR FREEDOM"},
+                number = {'valueformat': '.0f', 'suffix': '%'},
+                delta = {'valueformat': '.1f'},
+                gauge = {
+                    'axis': {'range': [None, 100]},
+                    'bar': {'color': "#FF0000"},
+                    'steps': [
+                        {'range': [0, 50], 'color': "lightgray"},
+                        {'range': [50, 80], 'color': "yellow"},
+                        {'range': [80, 100], 'color': "red"}
+                    ],
+                    'threshold': {
+                        'line': {'color': "red", 'width': 4},
+                        'thickness': 0.75,
+                        'value': 85
+                    }
                 }
-            }
+            ),
+            layout=dict(height=300)
         ))
-        fig.update_layout(height=300)
+        if np.isfinite(server_load):
+            self.figures.patch(fig, dict(value=server_load, delta={'reference': reference}))
         st.plotly_chart(fig, use_container_width=True)
 
-    def run_dashboard(self):
-        """Exécute le dashboard en temps réel"""
+    def live_fragment(self, func):
+        """Enveloppe une section live dans un fragment Streamlit rafraîchi périodiquement.
+
+        Seul le fragment est ré-exécuté toutes les `refresh_rate` secondes : le
+        thread du script n'est pas bloqué entre deux rafraîchissements et la
+        sidebar, le CSS et les sections statiques ne sont pas recalculés.
+        """
+        return st.fragment(run_every=self.refresh_rate)(func)
+
+    def display_live_section(self):
+        """Section live principale : mise à jour des données, métriques et graphiques"""
         # Mise à jour des données live
-        self.update_live_data()
-        
-        # Header
-        self.display_live_header()
+        with self.perf.section('refresh_live_data'):
+            self.refresh_live_data()
         
         # Métriques principales
-        self.display_live_metrics()
+        with self.perf.section('display_live_metrics'):
+            self.display_live_metrics()
         
         # Graphiques principaux
         self.create_live_charts()
+        self.perf.maybe_export()
+
+    def display_status(self):
+        """Information de statut sur l'émission en cours et alertes actives"""
+        st.info(f"🟢 Freedom {self.station_number} - Diffusion en cours: {self.current_show['name']} avec {self.current_show['host']}")
+        if self.alerts is not None:
+            for alert in self.alerts.active.values():
+                show = st.error if alert['severity'] == 'critical' else st.warning
+                show(f"🚨 {alert['subject']} - {alert['message']} ({alert['value']:g}, depuis {alert['timestamp'][11:16]})")
+
+    def run_dashboard(self):
+        """Exécute le dashboard en temps réel"""
+        # Fréquence choisie au rerun précédent (le slider est rendu en bas de page)
+        self.refresh_rate = st.session_state.get('refresh_rate', 30)
+        
+        # Header
+        self.display_live_header()
+        
+        # Métriques et graphiques live
+        self.live_fragment(self.display_live_section)()
         
         # Sections supplémentaires
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            self.create_social_feed()
+            self.live_fragment(self.timed('create_social_feed', self.create_social_feed))()
         
         with col2:
-            self.create_technical_monitoring()
+            self.live_fragment(self.timed('create_technical_monitoring', self.create_technical_monitoring))()
         
         # Auto-refresh
         st.markdown("---")
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            refresh_rate = st.slider("Fréquence de rafraîchissement (secondes)", 10, 60, 30)
+            st.slider("Fréquence de rafraîchissement (secondes)", 10, 60, 30, key='refresh_rate')
         
         with col2:
             if st.button("🔄 Rafraîchir Maintenant"):
                 st.rerun()
         
         # Information de statut
-        st.info(f"🟢 Freedom {self.station_number} - Diffusion en cours: {self.current_show['name']} avec {self.current_show['host']}")
+        self.live_fragment(self.display_status)()
         
-        # Simulation de mise à jour automatique
-        time.sleep(refresh_rate)
-        st.rerun()
+        # Durées des sections (mesures activées par FREEDOM_PERF, panneau affiché depuis la sidebar)
+        if self.perf.enabled and st.session_state.get('show_perf'):
+            self.live_fragment(self.display_perf_panel)()
+
+    def timed(self, name, func):
+        """`func` chronométrée sous le nom `name` (pour les sections rendues en fragment)"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.perf.section(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def display_perf_panel(self):
+        """Panneau repliable des durées p50 / p95 des sections sur les derniers rendus"""
+        with st.expander("⏱️ Perf", expanded=False):
+            st.dataframe(self.perf.summary(), hide_index=True, use_container_width=True)
+
+class FreedomOverviewDashboard:
+    """Vue d'ensemble : les stations côte à côte et les totaux de l'île.
+
+    Elle s'appuie sur les tableaux de bord de session de chaque station
+    (données, caches de figures) : passer de la vue d'ensemble à une station
+    ne recalcule rien, toutes les vues lisent les mêmes snapshots du store.
+    """
+
+    def __init__(self, dashboards, perf=None):
+        self.dashboards = dashboards
+        self.refresh_rate = 30
+        self.figures = FigureCache()
+        self.perf = perf or PerfTimings()
+
+    def live_fragment(self, func):
+        return st.fragment(run_every=self.refresh_rate)(func)
+
+    def refresh_live_data(self):
+        for dashboard in self.dashboards.values():
+            dashboard.refresh_live_data()
+
+    def island_listeners(self):
+        """Auditeurs cumulés de toutes les stations"""
+        return sum(dashboard.live_data['current_listeners'] for dashboard in self.dashboards.values())
+
+    def display_header(self):
+        """En-tête de la vue d'ensemble"""
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            st.markdown('<div class="dove-logo">🕊️</div>', unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown('<h1 class="main-header">FREEDOM RADIO RÉUNION</h1>', unsafe_allow_html=True)
+            st.markdown('<div class="live-badge">🔴 EN DIRECT - VUE D\'ENSEMBLE DE L\'ÎLE</div>',
+                       unsafe_allow_html=True)
+        
+        with col3:
+            first = next(iter(self.dashboards.values()))
+            self.live_fragment(first.display_clock)()
+
+    def display_island_metrics(self):
+        """Totaux de l'île et part de chaque station"""
+        st.markdown('<h3 class="section-header">📊 AUDIENCE TOTALE RÉUNION</h3>', unsafe_allow_html=True)
+        total = self.island_listeners()
+        columns = st.columns(len(self.dashboards) + 1)
+        
+        with columns[0]:
+            st.metric("AUDITEURS TOTAL ÎLE", f"{total:,}".replace(',', ' '))
+        
+        for column, (number, dashboard) in zip(columns[1:], self.dashboards.items()):
+            listeners = dashboard.live_data['current_listeners']
+            with column:
+                st.metric(
+                    label=f"FREEDOM {number}",
+                    value=f"{listeners:,}".replace(',', ' '),
+                    delta=f"{listeners * 100 / total:.0f}% de l'île" if total else None,
+                    delta_color='off'
+                )
+
+    def create_comparison_chart(self, hours=24):
+        """Auditeurs des stations sur les dernières heures, sur un même graphique"""
+        fig = self.figures.get('stations', lambda: go.Figure(
+            [go.Scatter(mode='lines', name=f"Freedom {number}", line=dict(color=color, width=3))
+             for number, color in zip(self.dashboards, ['#FF0000', '#0000FF'])],
+            layout=dict(
+                title=f"Auditeurs par station ({hours} h)",
+                xaxis_title="Heure",
+                yaxis_title="Auditeurs",
+                height=400,
+                hovermode='x unified',
+                uirevision='stations'
+            )
+        ))
+        start = datetime.now() - timedelta(hours=hours)
+        traces = []
+        for dashboard in self.dashboards.values():
+            series = dashboard.chart_series(start)
+            traces.append(dict(x=series['timestamp'], y=series['listeners']))
+        self.figures.patch(fig, *traces)
+        st.plotly_chart(fig, use_container_width=True)
+
+    def display_station_columns(self):
+        """Une colonne par station : émission en cours et communes en tête"""
+        for column, (number, dashboard) in zip(st.columns(len(self.dashboards)), self.dashboards.items()):
+            with column:
+                st.subheader(f"📻 {STATIONS[number]}")
+                show = dashboard.current_show
+                st.markdown(f"""
+                <div class="metric-card">
+                    <h4>{show['name']}</h4>
+                    <p>🎙️ {show['host']} · {show['start_time']} - {show['end_time']}</p>
+                    <p>Engagement : {show['engagement']}%</p>
+                </div>
+                """, unsafe_allow_html=True)
+                for commune, count, percentage in dashboard.geo_data.top(3):
+                    st.markdown(f"**{commune}** : {count:,} ({percentage:.1f}%)".replace(',', ' '))
+                if not dashboard.geo_measured:
+                    st.caption("Répartition par commune simulée")
+
+    def display_live_section(self):
+        """Section live de la vue d'ensemble, ré-exécutée seule à chaque rafraîchissement"""
+        with self.perf.section('overview.refresh_live_data'):
+            self.refresh_live_data()
+        with self.perf.section('overview.display_island_metrics'):
+            self.display_island_metrics()
+        with self.perf.section('overview.create_comparison_chart'):
+            self.create_comparison_chart()
+        with self.perf.section('overview.display_station_columns'):
+            self.display_station_columns()
+        self.perf.maybe_export()
+
+    def run_dashboard(self):
+        """Exécute la vue d'ensemble en temps réel"""
+        self.refresh_rate = st.session_state.get('refresh_rate', 30)
+        self.display_header()
+        self.live_fragment(self.display_live_section)()
+        
+        st.markdown("---")
+        st.slider("Fréquence de rafraîchissement (secondes)", 10, 60, 30, key='refresh_rate')
+        
+        if self.perf.enabled and st.session_state.get('show_perf'):
+            self.live_fragment(self.display_perf_panel)()
+
+    def display_perf_panel(self):
+        """Panneau repliable des durées p50 / p95 des sections sur les derniers rendus"""
+        with st.expander("⏱️ Perf", expanded=False):
+            st.dataframe(self.perf.summary(), hide_index=True, use_container_width=True)
+
+@st.cache_resource
+def get_perf_timings():
+    """Mesures de performance partagées par toutes les sessions du processus"""
+    return build_perf_timings()
+
+@st.cache_resource
+def get_tech_monitor():
+    """Monitoring technique partagé, échantillonné dans la boucle du store"""
+    return build_tech_monitor()
+
+@st.cache_resource
+def get_alert_engine():
+    """Moteur d'alertes partagé, évalué dans la boucle du store"""
+    return build_alert_engine()
+
+@st.cache_resource
+def get_audience_store():
+    """Store partagé des deux stations, démarré une seule fois par processus Streamlit.
+
+    Le monitoring technique et les alertes tournent dans la boucle du store ;
+    avec FREEDOM_API_PORT, l'API HTTP (freedom_api.py) aussi, et sert les
+    mêmes snapshots que le dashboard.
+    """
+    store = AudienceStore(perf=get_perf_timings())
+    store.services.append(get_tech_monitor().run)
+    get_alert_engine().watch(store, get_tech_monitor())
+    if os.environ.get('FREEDOM_API_PORT'):
+        api = AudienceAPI(store, host=os.environ.get('FREEDOM_API_HOST', '0.0.0.0'),
+                          port=int(os.environ['FREEDOM_API_PORT']), monitor=get_tech_monitor(),
+                          alerts=get_alert_engine())
+        store.services.append(api.serve)
+    return store.start()
 
 # Sidebar avec sélecteur de station et informations
 st.sidebar.title("🕊️ FREEDOM RADIO")
@@ -866,7 +1189,7 @@ st.sidebar.markdown("### La Radio de la Liberté")
 
 station_choice = st.sidebar.radio(
     "Sélectionnez la station:",
-    ["Freedom Radio Réunion 1 (91.9 FM)", "Freedom Radio Réunion 2 (92.7 FM)"],
+    [*STATIONS.values(), OVERVIEW_CHOICE],
     index=0
 )
 
@@ -886,19 +1209,54 @@ de l'île et propose une programmation variée allant
 du maloya traditionnel aux hits internationaux.
 """)
 
+def get_dashboard(station_number):
+    """Récupère le dashboard de la station depuis la session Streamlit.
+
+    L'instance est créée une seule fois par session et par station, puis
+    réutilisée à chaque rerun. Elle lit les données du store partagé de la
+    station au lieu de faire tourner sa propre simulation.
+    """
+    key = f"freedom_dashboard_{station_number}"
+    if key not in st.session_state:
+        st.session_state[key] = FreedomRadioReunionDashboard(
+            station_number, store=get_audience_store(), perf=get_perf_timings(), monitor=get_tech_monitor(),
+            alerts=get_alert_engine()
+        )
+    return st.session_state[key]
+
+# Les tableaux de bord des deux stations restent en session : changer de vue ne recalcule rien
+dashboards = {number: get_dashboard(number) for number in STATIONS}
+if station_choice == OVERVIEW_CHOICE:
+    if 'freedom_overview' not in st.session_state:
+        st.session_state['freedom_overview'] = FreedomOverviewDashboard(dashboards, perf=get_perf_timings())
+    dashboard = st.session_state['freedom_overview']
+else:
+    station_number = next(number for number, label in STATIONS.items() if label == station_choice)
+    dashboard = dashboards[station_number]
+
 # Afficher le drapeau de La Réunion
-dashboard = FreedomRadioReunionDashboard(1 if "Freedom Radio Réunion 1" in station_choice else 2)
-dashboard.display_reunion_flag()
+dashboards[1].display_reunion_flag()
 
-# Statistiques rapides dans la sidebar
+def display_quick_stats():
+    """Statistiques rapides de la sidebar, lues dans le store et le monitoring partagés"""
+    st.metric("Auditeurs Total Île", f"{get_audience_store().island_listeners():,}")
+    st.metric("Couverture Île", "100%")
+    tech_sample = get_tech_monitor().latest or {}
+    st.metric(
+        "Émetteurs Actifs",
+        f"{tech_sample['transmitters_up']}/{tech_sample['transmitters_total']}" if tech_sample.get('transmitters_total') else "-"
+    )
+
+# Statistiques rapides dans la sidebar, rafraîchies comme les sections live
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 Stats Rapides")
-st.sidebar.metric("Auditeurs Total Île", "157,900")
-st.sidebar.metric("Couverture Île", "100%")
-st.sidebar.metric("Émetteurs Actifs", "12/12")
+with st.sidebar:
+    st.fragment(run_every=st.session_state.get('refresh_rate', 30))(display_quick_stats)()
+
+# Mesures de performance (activées pour tout le processus par FREEDOM_PERF) : chaque session choisit d'afficher le panneau
+if get_perf_timings().enabled:
+    st.sidebar.toggle("⏱️ Mesures de performance", key='show_perf')
 
 # Lancement du dashboard
 if __name__ == "__main__":
-    station_number = 1 if "Freedom Radio Réunion 1" in station_choice else 2
-    dashboard = FreedomRadioReunionDashboard(station_number)
-    dashboard.run_dashboard()
\ No newline at end of file
+    dashboard.run_dashboard()
@@ -0,0 +1,247 @@
+# benchmark.py - mesures de performance du dashboard Freedom Radio Réunion
+"""Benchmarks des chemins de données et de rendu du dashboard.
+
+Le script charge Dashboard.py hors serveur Streamlit (les appels `st.*`
+ne rendent rien), chronomètre les méthodes des classes sur plusieurs
+scénarios (fenêtre d'historique, résolution, nombre de stations, abonnés
+au flux poussé), puis un passage complet de `run_dashboard` via `AppTest`.
+Les résultats sont écrits en JSON pour suivre les régressions d'une
+version à l'autre.
+
+    python benchmark.py                        # écrit benchmarks/<date>-<commit>.json
+    python benchmark.py --quick                # moins de répétitions
+    python benchmark.py --compare benchmarks/precedent.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import freedom_api
+import freedom_audience
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD_PATH = os.path.join(ROOT, 'Dashboard.py')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks')
+
+# Fenêtres d'historique (heures) et résolutions (minutes) mesurées
+HISTORY_SCENARIOS = {'48h': 48, '7j': 7 * 24, '30j': 30 * 24}
+RESOLUTIONS = (10, 1)
+STATION_COUNTS = (1, 2)
+SUBSCRIBER_COUNTS = (100, 1000)
+
+def load_dashboard_module():
+    """Charge Dashboard.py comme module, sur données simulées et sans thread producteur"""
+    # Les sources réelles et l'historique persistant fausseraient les mesures
+    for name in [name for name in os.environ if name.startswith('FREEDOM')]:
+        del os.environ[name]
+    # Pas d'avertissements « missing ScriptRunContext » hors serveur
+    import streamlit.config
+    import streamlit.logger
+    streamlit.config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+
+    spec = importlib.util.spec_from_file_location('freedom_dashboard', DASHBOARD_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.get_audience_store().stop()
+    # Les graphiques sont sérialisés comme le ferait Streamlit, sans être envoyés
+    module.st.plotly_chart = lambda figure, **kwargs: module.pio.to_json(figure, validate=False)
+    return module
+
+def measure(func, repeat, warmup=1):
+    """Durées (ms) de `repeat` appels de `func` après `warmup` appels de chauffe"""
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+def summarize(name, params, durations):
+    return {
+        'name': name,
+        'params': params,
+        'runs': len(durations),
+        'min_ms': round(min(durations), 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'max_ms': round(max(durations), 3),
+    }
+
+def method_cases(dashboard, hours):
+    """Méthodes chronométrées d'un dashboard"""
+    return {
+        'generate_historical_data': dashboard.generate_historical_data,
+        'update_live_data': dashboard.update_live_data,
+        # Séries de toute la fenêtre, sous le budget de points du graphique
+        'chart_series': lambda: dashboard.chart_series(datetime.now() - timedelta(hours=hours)),
+        'create_realtime_chart': dashboard.create_realtime_chart,
+        'create_geographic_chart': dashboard.create_geographic_chart,
+        'refresh_top_tracks': dashboard.refresh_top_tracks,
+        # Réapprentissage complet du profil, puis prévision seule
+        'forecast_fit': lambda: dashboard.forecaster.fit(
+            dashboard.history.window()['timestamp'], dashboard.history.window()['listeners']
+        ),
+        'refresh_forecast': dashboard.refresh_forecast,
+    }
+
+def bench_methods(module, repeat):
+    """Méthodes de FreedomRadioReunionDashboard, par fenêtre d'historique, résolution
+    et nombre de stations (chaque mesure couvre l'appel sur toutes les stations)"""
+    results = []
+    for label, hours in HISTORY_SCENARIOS.items():
+        for resolution in RESOLUTIONS:
+            for count in STATION_COUNTS:
+                params = {'history': label, 'resolution_minutes': resolution, 'stations': count}
+                dashboards = [
+                    module.FreedomRadioReunionDashboard(
+                        number, history_hours=hours, resolution_minutes=resolution, seed=0
+                    )
+                    for number in tuple(freedom_audience.STATIONS)[:count]
+                ]
+                per_station = [method_cases(dashboard, hours) for dashboard in dashboards]
+                for name in per_station[0]:
+                    funcs = [cases[name] for cases in per_station]
+
+                    def call_all(funcs=funcs):
+                        for func in funcs:
+                            func()
+
+                    results.append(summarize(name, params, measure(call_all, repeat)))
+    return results
+
+def bench_store(repeat):
+    """Un pas du store partagé (sources simulées), selon le nombre de stations"""
+    results = []
+    for count in STATION_COUNTS:
+        numbers = tuple(freedom_audience.STATIONS)[:count]
+        store = freedom_audience.AudienceStore(
+            station_numbers=numbers,
+            data_sources={number: freedom_audience.SimulatedAudienceSource() for number in numbers}
+        )
+        loop = asyncio.new_event_loop()
+        try:
+            durations = measure(lambda: loop.run_until_complete(store.tick()), repeat)
+        finally:
+            loop.close()
+        results.append(summarize('AudienceStore.tick', {'stations': count}, durations))
+    return results
+
+def bench_push(repeat):
+    """Diffusion des différences à des abonnés simulés (moitié lents, jamais vidés)"""
+    results = []
+    for stations in STATION_COUNTS:
+        numbers = tuple(freedom_audience.STATIONS)[:stations]
+        store = freedom_audience.AudienceStore(
+            station_numbers=numbers,
+            data_sources={number: freedom_audience.SimulatedAudienceSource() for number in numbers}
+        )
+        loop = asyncio.new_event_loop()
+        try:
+            for count in SUBSCRIBER_COUNTS:
+                broadcaster = freedom_api.LiveBroadcaster()
+                broadcaster.publish(store.snapshots)
+                subscribers = [broadcaster.subscribe() for _ in range(count)]
+                fast = subscribers[:count // 2]
+
+                def step():
+                    loop.run_until_complete(store.tick())
+                    broadcaster.publish(store.snapshots)
+                    for subscriber in fast:
+                        subscriber.pending = None
+
+                params = {'stations': stations, 'subscribers': count}
+                results.append(summarize('LiveBroadcaster.publish', params, measure(step, repeat)))
+        finally:
+            loop.close()
+    return results
+
+def bench_full_run(repeat):
+    """Passage complet du script (run_dashboard compris) via AppTest.
+
+    Une station : vue de la première station ; deux stations : vue d'ensemble.
+    Le store du script tourne toujours avec les deux stations.
+    """
+    from streamlit.testing.v1 import AppTest
+    results = []
+    for count in STATION_COUNTS:
+        app = AppTest.from_file(DASHBOARD_PATH, default_timeout=120)
+        if count > 1:
+            # La vue d'ensemble se choisit dans la sidebar, après un premier passage
+            app.run()
+            app.sidebar.radio[0].set_value(app.sidebar.radio[0].options[-1])
+        first = measure(app.run, 1, warmup=0)
+        results.append(summarize('run_dashboard', {'run': 'premier', 'stations': count}, first))
+        results.append(summarize('run_dashboard', {'run': 'rerun', 'stations': count}, measure(app.run, repeat, warmup=0)))
+        if app.exception:
+            raise RuntimeError(f"Exception pendant le rendu : {app.exception[0].value}")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'inconnu'
+
+def compare(results, reference_path):
+    """Affiche le rapport médiane actuelle / médiane de référence pour chaque mesure commune"""
+    with open(reference_path, encoding='utf-8') as handle:
+        reference = {
+            (entry['name'], json.dumps(entry['params'], sort_keys=True)): entry
+            for entry in json.load(handle)['results']
+        }
+    for entry in results:
+        previous = reference.get((entry['name'], json.dumps(entry['params'], sort_keys=True)))
+        if previous is None or not previous['median_ms']:
+            continue
+        ratio = entry['median_ms'] / previous['median_ms']
+        flag = '  <-- régression' if ratio > 1.2 else ''
+        print(f"{entry['name']:28s} {json.dumps(entry['params']):52s} x{ratio:5.2f}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help="répétitions par mesure")
+    parser.add_argument('--quick', action='store_true', help="3 répétitions, pour vérifier le script")
+    parser.add_argument('--output', help="fichier JSON de sortie (défaut : benchmarks/<date>-<commit>.json)")
+    parser.add_argument('--compare', help="fichier JSON de référence à comparer")
+    args = parser.parse_args(argv)
+    repeat = 3 if args.quick else args.repeat
+
+    module = load_dashboard_module()
+    results = bench_methods(module, repeat) + bench_store(repeat) + bench_push(repeat) + bench_full_run(repeat)
+
+    commit = git_commit()
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2, ensure_ascii=False)
+
+    for entry in results:
+        print(f"{entry['name']:28s} {json.dumps(entry['params']):52s} {entry['median_ms']:9.2f} ms")
+    print(f"Résultats écrits dans {output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
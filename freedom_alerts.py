@@ -0,0 +1,290 @@
+# freedom_alerts.py - alertes d'exploitation Freedom Radio Réunion
+# Règles de seuil et de détection d'anomalie évaluées à chaque nouvel
+# échantillon (audience publiée par le store, monitoring technique), dans la
+# boucle du store partagé : une seule évaluation par processus, quel que soit
+# le nombre de sessions ouvertes.
+import asyncio
+from collections import deque
+from datetime import datetime
+import json
+import logging
+import math
+import os
+import time
+import urllib.request
+
+from freedom_audience import STATIONS
+
+logger = logging.getLogger('freedom.alerts')
+
+class EWMA:
+    """Moyenne et variance à pondération exponentielle, mises à jour en O(1)"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.mean = None
+        self.variance = 0.0
+        self.count = 0
+
+    def zscore(self, value):
+        """Écart à la moyenne en nombre d'écarts-types (0 tant que la variance est nulle)"""
+        if self.mean is None or self.variance <= 0:
+            return 0.0
+        return (value - self.mean) / math.sqrt(self.variance)
+
+    def update(self, value):
+        if self.mean is None:
+            self.mean = float(value)
+        else:
+            difference = value - self.mean
+            increment = self.alpha * difference
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + difference * increment)
+        self.count += 1
+
+class AlertRule:
+    """Règle évaluée sur une métrique, un échantillon à la fois, pour chaque sujet (station, serveur).
+
+    `check` renvoie True si la condition d'alerte est remplie, False si elle
+    est levée, None entre les deux (bande d'hystérésis : l'état ne change
+    pas). L'alerte se déclenche après `for_samples` échantillons consécutifs
+    et se lève après `clear_samples`.
+    """
+
+    def __init__(self, name, metric, message, severity='warning', for_samples=1, clear_samples=1):
+        self.name = name
+        self.metric = metric
+        self.message = message
+        self.severity = severity
+        self.for_samples = for_samples
+        self.clear_samples = clear_samples
+
+    def check(self, subject, value):
+        raise NotImplementedError
+
+class ThresholdRule(AlertRule):
+    """Seuil haut (`above`) ou bas (`below`), levé seulement au-delà du niveau `clear`"""
+
+    def __init__(self, name, metric, message, above=None, below=None, clear=None, **options):
+        super().__init__(name, metric, message, **options)
+        self.above = above
+        self.below = below
+        self.clear = clear if clear is not None else above if above is not None else below
+
+    def check(self, subject, value):
+        if self.above is not None:
+            return True if value > self.above else False if value <= self.clear else None
+        return True if value < self.below else False if value >= self.clear else None
+
+class AnomalyRule(AlertRule):
+    """Écart brutal à la tendance récente, mesuré en écarts-types d'une moyenne glissante (EWMA).
+
+    Les statistiques de chaque sujet sont mises à jour après l'évaluation,
+    sans relire l'historique ; aucune alerte avant `warmup` échantillons.
+    `direction` : 'down' (chute), 'up' (pic) ou 'both'. L'écart doit aussi
+    dépasser `min_change` (fraction de la moyenne) : une série presque
+    constante ne déclenche pas sur une variation minime.
+    """
+
+    def __init__(self, name, metric, message, threshold=4.0, clear_threshold=1.5, alpha=0.05, warmup=30,
+                 direction='down', min_change=0.05, **options):
+        super().__init__(name, metric, message, **options)
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.alpha = alpha
+        self.warmup = warmup
+        self.direction = direction
+        self.min_change = min_change
+        self.stats = {}
+
+    def check(self, subject, value):
+        stats = self.stats.get(subject)
+        if stats is None:
+            stats = self.stats[subject] = EWMA(self.alpha)
+        ready = stats.count >= self.warmup
+        score = stats.zscore(value)
+        significant = ready and abs(value - stats.mean) >= self.min_change * abs(stats.mean)
+        stats.update(value)
+        if not ready:
+            return False
+        deviation = -score if self.direction == 'down' else score if self.direction == 'up' else abs(score)
+        if significant and deviation >= self.threshold:
+            return True
+        return False if abs(score) < self.clear_threshold else None
+
+def default_rules():
+    """Seuils du panneau technique (latence 80/110 ms, charge 85 %) et chutes d'audience"""
+    return [
+        # Rapport à l'audience attendue à cette heure : la baisse de minuit n'est pas une anomalie
+        AnomalyRule('chute_auditeurs', 'listeners_ratio', "Chute brutale du nombre d'auditeurs", severity='critical',
+                    for_samples=2),
+        ThresholdRule('latence_emetteurs', 'latency_ms', "Latence moyenne des émetteurs élevée",
+                      above=110, clear=80, for_samples=2),
+        ThresholdRule('charge_serveur', 'cpu_percent', "Charge du serveur de diffusion élevée",
+                      above=85, clear=75, for_samples=3),
+        ThresholdRule('emetteur_hors_ligne', 'transmitters_down', "Émetteur(s) hors ligne",
+                      above=0.5, severity='critical', for_samples=2),
+        ThresholdRule('flux_degrade', 'stream_quality', "Points de montage Icecast hors ligne",
+                      below=90, clear=95, severity='critical'),
+    ]
+
+class LogAlertSink:
+    """Alertes écrites dans le journal `freedom.alerts`"""
+
+    async def send(self, alert):
+        level = logging.WARNING if alert['state'] == 'firing' else logging.INFO
+        logger.log(level, "[%s] %s - %s (%s)", alert['severity'], alert['subject'], alert['message'], alert['state'])
+
+class FileAlertSink:
+    """Alertes ajoutées à un fichier JSON Lines"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, alert):
+        with open(self.path, 'a', encoding='utf-8') as alert_file:
+            alert_file.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+    async def send(self, alert):
+        await asyncio.to_thread(self.write, alert)
+
+class WebhookAlertSink:
+    """Alertes envoyées en POST JSON (Slack, Mattermost, outil d'astreinte...)"""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def post(self, alert):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(alert, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def send(self, alert):
+        try:
+            await asyncio.to_thread(self.post, alert)
+        except OSError as error:
+            logger.error("Webhook d'alerte injoignable (%s) : %s", self.url, error)
+
+class AlertEngine:
+    """Évalue les règles à chaque échantillon et notifie les changements d'état.
+
+    Une alerte n'est notifiée qu'à son déclenchement et à sa levée
+    (dédoublonnage par règle et sujet), avec un rappel toutes les
+    `repeat_after` secondes tant qu'elle reste active. `active` (alertes en
+    cours) et `recent` (dernières notifications) sont lus par le dashboard et
+    l'API ; `active` est remplacé, jamais modifié, à chaque changement, et
+    `version` compte les notifications (clé de cache de l'API).
+    """
+
+    def __init__(self, rules=None, sinks=(), repeat_after=3600, history=100):
+        self.rules = list(default_rules() if rules is None else rules)
+        self.sinks = list(sinks)
+        self.repeat_after = repeat_after
+        self.states = {}
+        self.active = {}
+        self.recent = deque(maxlen=history)
+        self.version = 0
+        self._deliveries = set()
+
+    def evaluate(self, subject, metrics, now=None):
+        """Applique toutes les règles dont la métrique figure dans `metrics`"""
+        now = time.time() if now is None else now
+        for rule in self.rules:
+            value = metrics.get(rule.metric)
+            if value is None or not math.isfinite(value):
+                continue
+            condition = rule.check(subject, value)
+            key = (rule.name, subject)
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = {'firing': False, 'streak': 0, 'notified_at': None}
+            if condition is None or condition == state['firing']:
+                state['streak'] = 0
+                if state['firing'] and self.repeat_after and now - state['notified_at'] >= self.repeat_after:
+                    self.notify(rule, subject, value, 'firing', now, state)
+                continue
+            state['streak'] += 1
+            if state['streak'] >= (rule.for_samples if condition else rule.clear_samples):
+                state['firing'] = condition
+                state['streak'] = 0
+                self.notify(rule, subject, value, 'firing' if condition else 'resolved', now, state)
+
+    def notify(self, rule, subject, value, alert_state, now, state):
+        alert = {
+            'rule': rule.name,
+            'subject': subject,
+            'severity': rule.severity,
+            'state': alert_state,
+            'message': rule.message,
+            'value': round(float(value), 2),
+            'timestamp': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+        }
+        state['notified_at'] = now
+        key = (rule.name, subject)
+        if alert_state == 'firing':
+            self.active = {**self.active, key: alert}
+        else:
+            self.active = {name: active for name, active in self.active.items() if name != key}
+        self.recent.appendleft(alert)
+        self.version += 1
+        for sink in self.sinks:
+            self.deliver(sink.send(alert))
+
+    def deliver(self, coroutine):
+        """Envoi en tâche de fond dans la boucle courante (sans boucle : envoi immédiat)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(coroutine)
+            return
+        task = loop.create_task(coroutine)
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    def on_publish(self, snapshots):
+        """Callback du store (AudienceStore.on_publish) : auditeurs de chaque station.
+
+        `listeners_ratio` rapporte l'audience à l'audience attendue (profil
+        saisonnier de la prévision) ; absent tant que la prévision n'est pas apprise.
+        """
+        for number, snapshot in snapshots.items():
+            subject = STATIONS.get(number, f"Freedom {number}")
+            listeners = snapshot['live_data']['current_listeners']
+            metrics = {'listeners': listeners}
+            expected = snapshot.get('expected_listeners')
+            if expected:
+                metrics['listeners_ratio'] = listeners / expected
+            self.evaluate(subject, metrics)
+
+    def on_tech_sample(self, sample):
+        """Callback du monitoring technique (TechMonitor.on_sample)"""
+        metrics = dict(sample)
+        if sample.get('transmitters_total'):
+            metrics['transmitters_down'] = sample['transmitters_total'] - sample.get('transmitters_up', 0)
+        self.evaluate("Serveur de diffusion", metrics)
+
+    def watch(self, store=None, monitor=None):
+        """Branche le moteur sur le store et le monitoring (évaluation dans leur boucle)"""
+        if store is not None:
+            store.on_publish.append(self.on_publish)
+        if monitor is not None:
+            monitor.on_sample.append(self.on_tech_sample)
+        return self
+
+def build_alert_engine():
+    """Moteur d'alertes selon l'environnement.
+
+    Les alertes vont toujours dans le journal ; en plus :
+    FREEDOM_ALERT_WEBHOOK : URL appelée en POST JSON à chaque changement d'état
+    FREEDOM_ALERT_FILE : fichier JSON Lines des alertes
+    """
+    sinks = [LogAlertSink()]
+    if os.environ.get('FREEDOM_ALERT_WEBHOOK'):
+        sinks.append(WebhookAlertSink(os.environ['FREEDOM_ALERT_WEBHOOK']))
+    if os.environ.get('FREEDOM_ALERT_FILE'):
+        sinks.append(FileAlertSink(os.environ['FREEDOM_ALERT_FILE']))
+    return AlertEngine(sinks=sinks)
@@ -0,0 +1,526 @@
+# freedom_api.py - service HTTP des audiences Freedom Radio Réunion (sans Streamlit)
+# Sert les mêmes données que le dashboard aux écrans du studio et au site web :
+#
+#     python freedom_api.py --port 8502
+#
+# ou, dans le processus Streamlit, avec FREEDOM_API_PORT=8502.
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from freedom_audience import (
+    DEFAULT_TRACK_WINDOW, MAX_CHART_POINTS, STATIONS, TRACK_WINDOWS, AudienceModel, AudienceStore, build_perf_timings
+)
+from freedom_alerts import build_alert_engine
+from freedom_monitoring import build_tech_monitor
+
+STATION_ROUTE = re.compile(r'/api/stations/(\d+)/(live|communes|show|tracks|history)')
+STREAM_ROUTE = re.compile(r'/api(?:/stations/(\d+))?/stream')
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 431: 'Request Header Fields Too Large'}
+
+class PushFrame:
+    """Changements à pousser aux abonnés, encodés une seule fois en événement SSE.
+
+    Les valeurs sont absolues (nouveau nombre d'auditeurs, nouveau compte de
+    la commune) : fusionner deux trames en gardant la plus récente ne perd
+    rien, ce qui permet de sauter les trames intermédiaires.
+    """
+
+    __slots__ = ('event', 'version', 'stations', '_encoded')
+
+    def __init__(self, event, version, stations):
+        self.event = event
+        self.version = version
+        self.stations = stations
+        self._encoded = None
+
+    def merged(self, newer):
+        """Trame équivalente à `self` suivie de `newer`"""
+        stations = {number: dict(changes) for number, changes in self.stations.items()}
+        for number, changes in newer.stations.items():
+            current = stations.setdefault(number, {})
+            communes = changes.get('communes')
+            current.update(changes)
+            if communes and 'communes' in self.stations.get(number, {}):
+                current['communes'] = {**self.stations[number]['communes'], **communes}
+        return PushFrame(self.event, newer.version, stations)
+
+    def only(self, station_numbers):
+        """Trame limitée à certaines stations (None : toutes)"""
+        if station_numbers is None:
+            return self
+        stations = {number: changes for number, changes in self.stations.items() if number in station_numbers}
+        return PushFrame(self.event, self.version, stations) if stations else None
+
+    def encode(self):
+        if self._encoded is None:
+            data = json.dumps({'version': self.version, 'stations': self.stations},
+                              ensure_ascii=False, separators=(',', ':'))
+            self._encoded = f"event: {self.event}\nid: {self.version}\ndata: {data}\n\n".encode('utf-8')
+        return self._encoded
+
+class PushSubscriber:
+    """Boîte aux lettres d'un abonné : au plus une trame en attente.
+
+    Si l'abonné n'a pas encore envoyé la trame précédente (client lent,
+    tampon TCP plein), la nouvelle y est fusionnée : les trames intermédiaires
+    sont abandonnées et l'abonné reçoit directement l'état le plus récent.
+    """
+
+    def __init__(self, station_numbers=None):
+        self.station_numbers = station_numbers
+        self.pending = None
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+
+    def push(self, frame):
+        frame = frame.only(self.station_numbers)
+        if frame is None:
+            return
+        if self.pending is None:
+            self.pending = frame
+        else:
+            self.pending = self.pending.merged(frame)
+            self.coalesced += 1
+        self._ready.set()
+
+    async def next_frame(self, timeout=None):
+        """Prochaine trame (None si rien n'est arrivé avant `timeout`)"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        frame, self.pending = self.pending, None
+        return frame
+
+class LiveBroadcaster:
+    """Calcule les changements entre deux publications du store et les diffuse.
+
+    Seuls les champs modifiés sont envoyés : auditeurs, tendance et communes
+    dont le compte a changé (comparaison vectorisée des comptes). Une même
+    trame, encodée une fois, est partagée par tous les abonnés à jour.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.state = {}
+        self.version = 0
+
+    def publish(self, snapshots):
+        """À brancher sur AudienceStore.on_publish"""
+        changes = {}
+        for number, snapshot in snapshots.items():
+            live_data, geo_data = snapshot['live_data'], snapshot['geo_data']
+            previous = self.state.get(number)
+            station_changes = {}
+            for field in ('current_listeners', 'trend', 'peak_today'):
+                if previous is None or previous[field] != live_data[field]:
+                    station_changes[field] = live_data[field]
+            if previous is None or len(previous['counts']) != len(geo_data.counts):
+                changed = range(len(geo_data.counts))
+            else:
+                changed = np.flatnonzero(previous['counts'] != geo_data.counts)
+            if len(changed):
+                station_changes['communes'] = {geo_data.names[i]: int(geo_data.counts[i]) for i in changed}
+            # Les comptes du snapshot sont une copie : on peut les garder tels quels
+            self.state[number] = {
+                'current_listeners': live_data['current_listeners'],
+                'trend': live_data['trend'],
+                'peak_today': live_data['peak_today'],
+                'counts': geo_data.counts,
+                'names': geo_data.names,
+            }
+            if station_changes:
+                changes[number] = station_changes
+        self.version = next(iter(snapshots.values()))['version']
+        if changes:
+            frame = PushFrame('diff', self.version, changes)
+            for subscriber in self.subscribers:
+                subscriber.push(frame)
+
+    def snapshot_frame(self):
+        """État complet courant, envoyé à l'abonnement avant les différences"""
+        stations = {
+            number: {
+                'current_listeners': state['current_listeners'],
+                'trend': state['trend'],
+                'peak_today': state['peak_today'],
+                'communes': dict(zip(state['names'], state['counts'].tolist())),
+            }
+            for number, state in self.state.items()
+        }
+        return PushFrame('snapshot', self.version, stations)
+
+    def subscribe(self, station_numbers=None):
+        subscriber = PushSubscriber(station_numbers)
+        subscriber.push(self.snapshot_frame())
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+class AudienceAPI:
+    """Service HTTP/1.1 asynchrone exposant les snapshots du store en JSON.
+
+    Chaque réponse est sérialisée (et compressée en gzip à la demande) une
+    seule fois par version du store, puis servie telle quelle à tous les
+    clients ; un client qui renvoie l'ETag reçu (If-None-Match) obtient un
+    304 sans corps. Le service tourne dans la boucle asyncio du store : il lit
+    les snapshots publiés, sans verrou ni copie.
+
+    GET /api/stations                        auditeurs par station et total île
+    GET /api/stations/<n>/live               données live et émission en cours
+    GET /api/stations/<n>/communes           audience par commune (décroissante)
+    GET /api/stations/<n>/show               émission en cours
+    GET /api/stations/<n>/tracks             top titres
+    GET /api/stations/<n>/history?hours=24&max_points=800
+    GET /api/stream, /api/stations/<n>/stream   flux Server-Sent Events des changements
+    GET /api/tech                            dernier échantillon du monitoring technique
+    GET /api/alerts                          alertes actives et dernières notifications
+    GET /health
+    """
+
+    def __init__(self, store, host='0.0.0.0', port=8502, keepalive_timeout=15,
+                 max_cache_entries=512, gzip_min_size=512, heartbeat=15, monitor=None,
+                 alerts=None):
+        self.store = store
+        self.monitor = monitor
+        self.alerts = alerts
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.max_cache_entries = max_cache_entries
+        self.gzip_min_size = gzip_min_size
+        # Vues en lecture seule sur les snapshots, pour les séries d'historique
+        self.models = {number: AudienceModel(number, store=store) for number in store.station_numbers}
+        self._model_locks = {number: threading.Lock() for number in store.station_numbers}
+        self._cache = {}
+        self._cache_version = None
+        self._server = None
+        self._connections = set()
+        # Flux poussé : différences calculées une fois par publication du store
+        self.heartbeat = heartbeat
+        self.broadcaster = LiveBroadcaster()
+        self.broadcaster.publish(store.snapshots)
+        store.on_publish.append(self.broadcaster.publish)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle, self.host, self.port)
+        return self._server
+
+    async def serve(self):
+        """Service du store (voir AudienceStore.services) : écoute jusqu'à l'annulation"""
+        server = await self.start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Les connexions keep-alive ouvertes sont fermées avec le service
+            for connection in list(self._connections):
+                connection.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    # Contenu des réponses
+
+    def payload(self, snapshots, path, query):
+        """Objet JSON de la ressource `path` (KeyError : inconnue, ValueError : paramètres invalides)"""
+        if path == '/api/stations':
+            stations = [
+                {
+                    'station': number,
+                    'name': STATIONS.get(number, f"Freedom {number}"),
+                    'current_listeners': snapshot['live_data']['current_listeners'],
+                    'trend': snapshot['live_data']['trend'],
+                    'current_show': snapshot['current_show']['name'],
+                }
+                for number, snapshot in snapshots.items()
+            ]
+            return {
+                'island_listeners': sum(station['current_listeners'] for station in stations),
+                'stations': stations,
+            }
+        if path == '/health':
+            return {'status': 'ok'}
+        if path == '/api/tech' and self.monitor is not None:
+            # NaN (non mesuré) n'existe pas en JSON
+            return {
+                name: None if isinstance(value, float) and not np.isfinite(value) else value
+                for name, value in (self.monitor.latest or {}).items()
+            }
+        if path == '/api/alerts' and self.alerts is not None:
+            return {'active': list(self.alerts.active.values()), 'recent': list(self.alerts.recent)}
+
+        match = STATION_ROUTE.fullmatch(path)
+        if match is None:
+            raise KeyError(path)
+        number, resource = int(match.group(1)), match.group(2)
+        snapshot = snapshots[number]
+        if resource == 'live':
+            return {'live_data': snapshot['live_data'], 'current_show': snapshot['current_show']}
+        if resource == 'communes':
+            geo_data = snapshot['geo_data']
+            return {
+                'total': geo_data.total,
+                # Répartition simulée tant qu'aucune source ne localise les auditeurs
+                'simulated': not snapshot['geo_measured'],
+                'communes': [
+                    {'commune': commune, 'listeners': count, 'share': round(share, 2)}
+                    for commune, count, share in geo_data.top(len(geo_data))
+                ],
+            }
+        if resource == 'show':
+            return snapshot['current_show']
+        if resource == 'tracks':
+            window = parse_qs(query).get('window', [DEFAULT_TRACK_WINDOW])[0].replace(' ', '')
+            windows = {label.replace(' ', ''): label for label in TRACK_WINDOWS}
+            if window not in windows:
+                raise ValueError(f"window doit être l'une de : {', '.join(windows)}")
+            return snapshot['top_tracks_by_window'][windows[window]]
+        return self.history_payload(number, snapshot, query)
+
+    def history_payload(self, number, snapshot, query):
+        """Séries d'historique (sous-échantillonnées comme le graphique du dashboard)"""
+        params = parse_qs(query)
+        hours = float(params.get('hours', ['24'])[0])
+        max_points = int(params.get('max_points', [str(MAX_CHART_POINTS)])[0])
+        if not 0 < hours <= 30 * 24 or not 2 <= max_points <= 10 * MAX_CHART_POINTS:
+            raise ValueError("hours doit être dans ]0, 720] et max_points dans [2, 8000]")
+        # Appelé hors de la boucle (voir `cached`) : une requête à la fois par vue de station
+        with self._model_locks[number]:
+            model = self.models[number]
+            model.load_snapshot(snapshot)
+            series = model.chart_series(datetime.now() - timedelta(hours=hours), max_points=max_points)
+        return {
+            name: (np.datetime_as_string(np.asarray(values, dtype='datetime64[s]')).tolist()
+                   if name == 'timestamp' else np.round(np.asarray(values, dtype=np.float64), 1).tolist())
+            for name, values in series.items()
+        }
+
+    def source_version(self, path):
+        """Version propre aux ressources qui ne suivent pas les publications du store (None sinon)"""
+        if path == '/api/tech' and self.monitor is not None:
+            return self.monitor.version
+        if path == '/api/alerts' and self.alerts is not None:
+            return self.alerts.version
+        return None
+
+    def encode(self, snapshots, path, query):
+        """Corps JSON de la ressource"""
+        return json.dumps(
+            self.payload(snapshots, path, query),
+            ensure_ascii=False, separators=(',', ':'), default=_json_default
+        ).encode('utf-8')
+
+    async def cached(self, path, query):
+        """Réponse sérialisée pour la version courante du store : {'etag', 'body', 'gzip', 'version'}.
+
+        L'historique (lecture Parquet possible sur les longues périodes) est
+        calculé dans un thread : la boucle du store, ses publications et les
+        flux SSE ne l'attendent pas.
+        """
+        snapshots = self.store.snapshots
+        version = next(iter(snapshots.values()))['version']
+        if version != self._cache_version or len(self._cache) >= self.max_cache_entries:
+            self._cache = {}
+            self._cache_version = version
+        # Le monitoring et les alertes changent à leur propre rythme : leur version entre dans la clé
+        key = (path, query, self.source_version(path))
+        entry = self._cache.get(key)
+        if entry is None:
+            route = STATION_ROUTE.fullmatch(path)
+            if route is not None and route.group(2) == 'history':
+                body = await asyncio.to_thread(self.encode, snapshots, path, query)
+            else:
+                body = self.encode(snapshots, path, query)
+            # ETag issu du contenu : inchangé d'une version à l'autre si la ressource n'a pas bougé
+            tag = hashlib.blake2b(body, digest_size=8).hexdigest()
+            entry = {'etag': f'"{tag}"', 'body': body, 'gzip': None, 'version': version}
+            # Le store a pu publier pendant le calcul : on ne met pas en cache une réponse périmée
+            if version == self._cache_version:
+                self._cache[key] = entry
+        return entry
+
+    async def respond(self, method, target, headers):
+        """(statut, en-têtes, corps) de la requête"""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b''
+        url = urlsplit(target)
+        try:
+            entry = await self.cached(url.path.rstrip('/') or '/', url.query)
+        except KeyError:
+            return 404, {'Content-Type': 'application/json'}, b'{"error":"ressource inconnue"}'
+        except ValueError as error:
+            body = json.dumps({'error': str(error)}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            return 400, {'Content-Type': 'application/json; charset=utf-8'}, body
+
+        body, etag = entry['body'], entry['etag']
+        response_headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'Access-Control-Allow-Origin': '*',
+            'X-Freedom-Version': str(entry['version']),
+        }
+        if 'gzip' in headers.get('accept-encoding', '') and len(body) >= self.gzip_min_size:
+            if entry['gzip'] is None:
+                entry['gzip'] = gzip.compress(body, compresslevel=6)
+            body = entry['gzip']
+            etag = etag[:-1] + '-gz"'
+            response_headers['Content-Encoding'] = 'gzip'
+        response_headers['ETag'] = etag
+
+        if _etag_matches(headers.get('if-none-match'), etag):
+            return 304, response_headers, b''
+        return 200, response_headers, body
+
+    # Protocole HTTP/1.1 minimal (keep-alive, sans corps de requête)
+
+    async def handle(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = await self.read_headers(reader)
+                if len(parts) != 3 or headers is None:
+                    await self.send(writer, 400 if headers is not None else 431, {}, b'', 'GET', False)
+                    break
+                method, target, version = parts
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+                stream = STREAM_ROUTE.fullmatch(urlsplit(target).path.rstrip('/'))
+                if stream is not None and method == 'GET':
+                    station = int(stream.group(1)) if stream.group(1) else None
+                    await self.stream(writer, None if station is None else {station})
+                    break
+                status, response_headers, body = await self.respond(method, target, headers)
+                await self.send(writer, status, response_headers, body, method, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # arrêt du service : la connexion est simplement fermée
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def stream(self, writer, station_numbers):
+        """Flux SSE : état complet, puis différences au fil des publications.
+
+        L'envoi attend que le tampon TCP se vide (drain) ; pendant ce temps les
+        nouvelles différences sont fusionnées dans la boîte de l'abonné, qui ne
+        reçoit donc jamais une file de trames périmées.
+        """
+        if station_numbers is not None and not station_numbers <= set(self.store.station_numbers):
+            await self.send(writer, 404, {'Content-Type': 'application/json'},
+                            b'{"error":"ressource inconnue"}', 'GET', False)
+            return
+        writer.write(("HTTP/1.1 200 OK\r\n"
+                      "Content-Type: text/event-stream; charset=utf-8\r\n"
+                      "Cache-Control: no-cache\r\n"
+                      "Access-Control-Allow-Origin: *\r\n"
+                      "Connection: keep-alive\r\n\r\n").encode('latin-1'))
+        # Petit tampon d'envoi : un client lent bloque vite drain() et ses trames sont fusionnées
+        writer.transport.set_write_buffer_limits(high=16 * 1024)
+        subscriber = self.broadcaster.subscribe(station_numbers)
+        try:
+            while True:
+                frame = await subscriber.next_frame(self.heartbeat)
+                # Commentaire SSE : garde la connexion ouverte derrière les proxys
+                writer.write(frame.encode() if frame is not None else b": ping\n\n")
+                await writer.drain()
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
+
+    @staticmethod
+    async def read_headers(reader, max_headers=100):
+        """En-têtes de la requête (noms en minuscules), None s'ils sont trop nombreux"""
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            if len(headers) >= max_headers:
+                return None
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def send(writer, status, headers, body, method, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        if method != 'HEAD' and status not in (204, 304):
+            writer.write(body)
+        await writer.drain()
+
+def _json_default(value):
+    """Types NumPy / dates des snapshots vers JSON"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, (datetime, np.datetime64)):
+        return str(value)
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in candidates
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP des audiences Freedom Radio Réunion")
+    parser.add_argument('--host', default=os.environ.get('FREEDOM_API_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FREEDOM_API_PORT', 8502)))
+    parser.add_argument('--interval', type=float, default=10, help="secondes entre deux pas du store")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    store = AudienceStore(interval=args.interval, perf=build_perf_timings())
+    monitor = build_tech_monitor()
+    store.services.append(monitor.run)
+    alerts = build_alert_engine().watch(store, monitor)
+    store.services.append(AudienceAPI(store, host=args.host, port=args.port, monitor=monitor, alerts=alerts).serve)
+    print(f"API Freedom sur http://{args.host}:{args.port}/api/stations")
+    try:
+        store.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.stop()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,2354 @@
+# freedom_audience.py - modèle de données d'audience Freedom Radio Réunion
+# Aucune dépendance à Streamlit : utilisé par le dashboard (Dashboard.py)
+# et par le service HTTP sans interface (freedom_api.py).
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import random
+import asyncio
+import atexit
+import bisect
+from collections import deque
+from collections.abc import Mapping
+import contextlib
+import copy
+import csv
+import functools
+import hashlib
+import heapq
+import http.client
+import http.server
+import itertools
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from urllib.parse import unquote_to_bytes, urlsplit
+from xml.etree import ElementTree
+
+from freedom_forecast import SeasonalForecaster
+
+try:  # pyarrow n'est requis que pour l'historique persistant (FREEDOM_HISTORY_DIR)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger('freedom.audience')
+
+# Stations du groupe : numéro -> libellé du sélecteur
+STATIONS = {
+    1: "Freedom Radio Réunion 1 (91.9 FM)",
+    2: "Freedom Radio Réunion 2 (92.7 FM)",
+}
+
+# Profil circadien de l'audience à La Réunion, indexé par heure (0-23).
+# Tranches : nuit 0-5h, morning show 6-9h, journée 10-15h,
+# retour travail/école 16-19h, prime time 20-23h
+_HOUR_SLOTS = [6, 4, 6, 4, 4]
+HOURLY_BASE_LISTENERS = np.repeat([25000, 85000, 65000, 78000, 92000], _HOUR_SLOTS)
+HOURLY_VARIATION_LOW = np.repeat([-5000, -8000, -5000, -6000, -10000], _HOUR_SLOTS)
+HOURLY_VARIATION_HIGH = np.repeat([8000, 15000, 7000, 10000, 18000], _HOUR_SLOTS)
+# Simulation live : cible (fraction de l'audience de référence) et volatilité par heure
+HOURLY_TARGET_FACTOR = np.repeat([0.35, 1.0, 0.85, 0.95, 1.08], _HOUR_SLOTS)
+HOURLY_VOLATILITY = np.repeat([0.08, 0.06, 0.04, 0.05, 0.07], _HOUR_SLOTS)
+
+class AudienceRingBuffer:
+    """Tampon circulaire de taille fixe pour la série temporelle d'audience.
+
+    Chaque colonne est un tableau NumPy préalloué de taille 2 x capacité
+    physique : chaque point est écrit deux fois (position et miroir), si bien
+    que toute fenêtre récente est une tranche contiguë, donc une vue sans copie.
+    La capacité physique dépasse la capacité utile de `slack` points pour que
+    les vues déjà remises aux lecteurs restent valides pendant les écritures
+    suivantes. La mémoire reste bornée quelle que soit la durée d'exécution.
+    """
+
+    COLUMNS = ('listeners', 'mobile_percent', 'engagement')
+
+    # Valeurs du dernier point figées par `frozen(pin_last=True)`, None sinon
+    pinned_last = None
+
+    def __init__(self, capacity, slack=64, columns=None, dtype=np.int64):
+        self.capacity = capacity
+        self.physical_capacity = capacity + slack
+        self.column_names = tuple(columns or self.COLUMNS)
+        size = 2 * self.physical_capacity
+        self.timestamps = np.zeros(size, dtype='datetime64[ns]')
+        self.columns = {name: np.zeros(size, dtype=dtype) for name in self.column_names}
+        self.count = 0  # nombre total de points ajoutés depuis la création
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, *values):
+        """Ajoute un point en O(1) (une valeur par colonne, dans l'ordre des colonnes)"""
+        position = self.count % self.physical_capacity
+        self.timestamps[position] = self.timestamps[position + self.physical_capacity] = np.datetime64(timestamp, 'ns')
+        self.count += 1
+        self.update_last(*values)
+
+    def update_last(self, *values):
+        """Remplace en O(1) les valeurs du dernier point"""
+        position = (self.count - 1) % self.physical_capacity
+        mirror = position + self.physical_capacity
+        for name, value in zip(self.column_names, values):
+            column = self.columns[name]
+            column[position] = column[mirror] = value
+
+    def last_row(self):
+        if self.pinned_last is not None:
+            return dict(self.pinned_last)
+        position = (self.count - 1) % self.physical_capacity
+        return {name: column[position] for name, column in self.columns.items()}
+
+    def extend(self, frame):
+        """Ajoute d'un bloc les points d'un DataFrame (seuls les `capacity` derniers sont gardés)"""
+        frame = frame.iloc[-self.capacity:]
+        positions = (self.count + np.arange(len(frame))) % self.physical_capacity
+        targets = [(self.timestamps, frame['timestamp'].to_numpy(dtype='datetime64[ns]'))]
+        targets += [(self.columns[name], frame[name].to_numpy()) for name in self.column_names]
+        for column, values in targets:
+            column[positions] = values
+            column[positions + self.physical_capacity] = values
+        self.count += len(frame)
+
+    def window(self, points=None):
+        """Vues (sans copie) sur les `points` derniers points, toutes colonnes"""
+        size = len(self) if points is None else min(points, len(self))
+        offset = (self.count - size) % self.physical_capacity
+        window = slice(offset, offset + size)
+        view = {'timestamp': self.timestamps[window]}
+        for name, column in self.columns.items():
+            view[name] = column[window]
+        if self.pinned_last is not None and size:
+            # Le dernier point peut être réécrit par le producteur : on lit la copie figée
+            for name, value in self.pinned_last.items():
+                view[name] = view[name].copy()
+                view[name][-1] = value
+        return view
+
+    def between(self, start, end=None):
+        """Vues (sans copie) sur les points entre `start` et `end` inclus.
+
+        Les horodatages étant triés, les bornes sont trouvées par recherche
+        dichotomique (O(log n)) et le résultat est une tranche du tampon.
+        """
+        view = self.window()
+        timestamps = view['timestamp']
+        first = np.searchsorted(timestamps, np.datetime64(start, 'ns'), side='left')
+        last = len(timestamps) if end is None else np.searchsorted(timestamps, np.datetime64(end, 'ns'), side='right')
+        return {name: values[first:last] for name, values in view.items()}
+
+    def last(self, duration, now=None):
+        """Vues (sans copie) sur les points postérieurs à `now - duration`"""
+        return self.between((now or datetime.now()) - duration)
+
+    def first_timestamp(self):
+        if self.count == 0:
+            return None
+        return pd.Timestamp(self.timestamps[(self.count - len(self)) % self.physical_capacity])
+
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return pd.Timestamp(self.timestamps[(self.count - 1) % self.physical_capacity])
+
+    def to_frame(self, points=None):
+        """Copie de la fenêtre demandée sous forme de DataFrame"""
+        view = self.window(points)
+        frame = pd.DataFrame({name: values.copy() for name, values in view.items()})
+        frame.insert(2, 'hour', frame['timestamp'].dt.hour)
+        return frame
+
+    def frozen(self, pin_last=False):
+        """Copie légère figée à l'instant présent, partageant les mêmes tableaux.
+
+        Sert aux snapshots : le lecteur voit les points existants au moment de
+        la publication, même si le producteur continue d'écrire. Avec
+        `pin_last`, les valeurs du dernier point sont copiées, pour les
+        tampons dont le producteur réécrit ce point (`update_last`).
+        """
+        ring = copy.copy(self)
+        if pin_last and self.count:
+            ring.pinned_last = self.last_row()
+        return ring
+
+# Nombre maximal de points par série renvoyée pour un graphique
+MAX_CHART_POINTS = 800
+
+# Horizon de la prévision affichée sur le graphique temps réel (heures)
+FORECAST_HOURS = 6
+
+# Historique sur lequel la prévision est apprise (jours), persistant compris
+FORECAST_FIT_DAYS = 28
+
+class AudienceRollups:
+    """Agrégats multi-résolution de l'audience, maintenus au fil de l'eau.
+
+    Pour chaque palier (1 min, 10 min, 1 h, 1 jour), un tampon circulaire
+    garde par intervalle le min, le max, la moyenne et la dernière valeur des
+    auditeurs et de l'engagement. Un nouveau point met à jour en O(1)
+    l'intervalle ouvert de chaque palier.
+    """
+
+    # Palier -> (durée de l'intervalle en secondes, durée de rétention)
+    TIERS = {
+        '1min': (60, timedelta(days=2)),
+        '10min': (600, timedelta(days=14)),
+        '1h': (3600, timedelta(days=90)),
+        '1d': (86400, timedelta(days=3 * 365)),
+    }
+    METRICS = ('listeners', 'engagement')
+    STATS = ('min', 'max', 'mean', 'last')
+    COLUMNS = (
+        'listeners_min', 'listeners_max', 'listeners_mean', 'listeners_last',
+        'engagement_min', 'engagement_max', 'engagement_mean', 'engagement_last',
+        'count'
+    )
+
+    def __init__(self):
+        self.tiers = {}
+        self.open_buckets = {}
+        for name, (seconds, retention) in self.TIERS.items():
+            capacity = int(retention.total_seconds() // seconds) + 1
+            self.tiers[name] = AudienceRingBuffer(capacity, columns=self.COLUMNS, dtype=np.float64)
+            self.open_buckets[name] = None
+
+    @staticmethod
+    def bucket_start(timestamp, seconds):
+        return pd.Timestamp(timestamp).floor(f"{seconds}s")
+
+    def add(self, timestamp, listeners, engagement):
+        """Intègre un point dans l'intervalle ouvert de chaque palier"""
+        for name, (seconds, _) in self.TIERS.items():
+            ring = self.tiers[name]
+            bucket = self.bucket_start(timestamp, seconds)
+            if bucket != self.open_buckets[name]:
+                ring.append(bucket, listeners, listeners, listeners, listeners,
+                            engagement, engagement, engagement, engagement, 1)
+                self.open_buckets[name] = bucket
+                continue
+            row = ring.last_row()
+            count = row['count'] + 1
+            ring.update_last(
+                min(row['listeners_min'], listeners), max(row['listeners_max'], listeners),
+                row['listeners_mean'] + (listeners - row['listeners_mean']) / count, listeners,
+                min(row['engagement_min'], engagement), max(row['engagement_max'], engagement),
+                row['engagement_mean'] + (engagement - row['engagement_mean']) / count, engagement,
+                count
+            )
+
+    def extend(self, frame):
+        """Chargement initial vectorisé à partir d'un DataFrame d'historique"""
+        if frame.empty:
+            return
+        for name, (seconds, _) in self.TIERS.items():
+            aggregated = aggregate_history(frame, seconds)
+            self.tiers[name].extend(aggregated)
+            self.open_buckets[name] = aggregated['timestamp'].iloc[-1]
+
+    @classmethod
+    def select_tier(cls, duration, max_points=MAX_CHART_POINTS):
+        """Palier le plus fin qui tient dans le budget de points"""
+        for name, (seconds, _) in cls.TIERS.items():
+            if duration.total_seconds() / seconds <= max_points:
+                return name
+        return name
+
+    def covers(self, name, start):
+        first_timestamp = self.tiers[name].first_timestamp()
+        return first_timestamp is not None and first_timestamp <= start
+
+    def frozen(self):
+        rollups = copy.copy(self)
+        # L'intervalle ouvert de chaque palier est réécrit en place à chaque point
+        rollups.tiers = {name: ring.frozen(pin_last=True) for name, ring in self.tiers.items()}
+        rollups.open_buckets = dict(self.open_buckets)
+        return rollups
+
+def aggregate_history(frame, seconds):
+    """Agrège un historique brut en intervalles de `seconds` (mêmes colonnes que les paliers)"""
+    buckets = frame['timestamp'].dt.floor(f"{seconds}s")
+    grouped = frame.groupby(buckets, sort=True)
+    aggregated = pd.DataFrame({'timestamp': grouped['timestamp'].first().index})
+    for metric in AudienceRollups.METRICS:
+        stats = grouped[metric].agg(['min', 'max', 'mean', 'last'])
+        for stat in AudienceRollups.STATS:
+            aggregated[f"{metric}_{stat}"] = stats[stat].to_numpy(dtype=np.float64)
+    aggregated['count'] = grouped.size().to_numpy(dtype=np.float64)
+    return aggregated
+
+def lttb_indices(x, y, threshold):
+    """Indices retenus par l'algorithme Largest-Triangle-Three-Buckets"""
+    n_points = len(y)
+    if threshold >= n_points or threshold < 3:
+        return np.arange(n_points)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n_points - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n_points - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n_points
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+class PerfTimings:
+    """Durées des sections du dashboard sur les derniers rendus.
+
+    Désactivé, `section()` renvoie un contexte vide partagé : le coût se limite
+    à un test de booléen. Activé, chaque section garde ses `window` dernières
+    durées (p50 / p95) et des cumuls exportables au format texte Prometheus,
+    vers un fichier ou sur un petit endpoint HTTP `/metrics`.
+    """
+
+    _DISABLED = contextlib.nullcontext()
+
+    def __init__(self, enabled=False, window=200, export_path=None, export_interval=10):
+        self.enabled = enabled
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+        self._server = None
+
+    def section(self, name):
+        """Contexte chronométrant le bloc sous le nom `name` (sans effet si désactivé)"""
+        if not self.enabled:
+            return self._DISABLED
+        return _PerfSection(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            count, total = self._totals.get(name, (0, 0.0))
+            self._totals[name] = (count + 1, total + seconds)
+
+    def summary(self):
+        """p50 / p95 / dernière durée (ms) de chaque section sur la fenêtre récente"""
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=np.float64) for name, values in self._samples.items()}
+        rows = [
+            {
+                'section': name,
+                'rendus': len(values),
+                'p50 (ms)': round(float(np.percentile(values, 50)) * 1000, 2),
+                'p95 (ms)': round(float(np.percentile(values, 95)) * 1000, 2),
+                'dernier (ms)': round(float(values[-1]) * 1000, 2),
+            }
+            for name, values in samples.items()
+        ]
+        return pd.DataFrame(rows, columns=['section', 'rendus', 'p50 (ms)', 'p95 (ms)', 'dernier (ms)'])
+
+    def prometheus_text(self):
+        """Métriques au format d'exposition texte de Prometheus"""
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=np.float64) for name, values in self._samples.items()}
+            totals = dict(self._totals)
+        lines = [
+            "# HELP freedom_section_duration_seconds Durée des sections du dashboard (fenêtre récente).",
+            "# TYPE freedom_section_duration_seconds summary",
+        ]
+        for name, values in samples.items():
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            for quantile in (0.5, 0.95):
+                value = float(np.quantile(values, quantile))
+                lines.append(f'freedom_section_duration_seconds{{section="{label}",quantile="{quantile}"}} {value:.9g}')
+            count, total = totals[name]
+            lines.append(f'freedom_section_duration_seconds_sum{{section="{label}"}} {total:.9g}')
+            lines.append(f'freedom_section_duration_seconds_count{{section="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Écrit les métriques Prometheus dans un fichier (remplacement atomique)"""
+        path = path or self.export_path
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            handle.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def maybe_export(self):
+        """Export vers `export_path` au plus une fois toutes les `export_interval` secondes"""
+        if self.export_path and self.enabled and time.monotonic() - self._last_export >= self.export_interval:
+            self._last_export = time.monotonic()
+            self.export()
+
+    def serve(self, port, host='0.0.0.0'):
+        """Expose `/metrics` dans un thread HTTP dédié (démarré une seule fois)"""
+        if self._server is not None:
+            return self._server
+        timings = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = timings.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="freedom-perf-metrics", daemon=True).start()
+        return self._server
+
+class _PerfSection:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.record(self.name, time.perf_counter() - self.start)
+        return False
+
+def build_perf_timings():
+    """Mesures de performance selon l'environnement.
+
+    FREEDOM_PERF=1 : mesures actives dès le démarrage
+    FREEDOM_PERF_FILE : fichier texte Prometheus mis à jour périodiquement
+    FREEDOM_PERF_PORT : port de l'endpoint HTTP /metrics
+    """
+    timings = PerfTimings(
+        enabled=os.environ.get('FREEDOM_PERF', '') not in ('', '0'),
+        export_path=os.environ.get('FREEDOM_PERF_FILE') or None
+    )
+    if os.environ.get('FREEDOM_PERF_PORT'):
+        timings.serve(int(os.environ['FREEDOM_PERF_PORT']))
+    return timings
+
+class ParquetHistoryStore:
+    """Historique d'audience persistant, en fichiers Parquet partitionnés par jour.
+
+    Arborescence : `<racine>/station=<n>/date=AAAA-MM-JJ/part-*.parquet`.
+    Les points sont mis en tampon puis écrits par lots (un fichier par lot et
+    par jour, écriture atomique) ; un lot dont l'écriture échoue (disque
+    plein...) reste en tampon, borné à `max_buffer` points, et l'écriture est
+    retentée au lot suivant. Les lots d'un jour écoulé sont regroupés en un seul
+    fichier. Une lecture ne parcourt que les partitions du jour concernées et
+    filtre les horodatages dans pyarrow (statistiques des row groups), avec
+    des fichiers mappés en mémoire.
+    """
+
+    COLUMNS = ('timestamp',) + AudienceRingBuffer.COLUMNS
+
+    def __init__(self, root, station_number, flush_every=6, max_buffer=10000):
+        if pq is None:
+            raise ImportError("pyarrow est requis pour l'historique persistant (pip install pyarrow)")
+        self.directory = os.path.join(root, f"station={station_number}")
+        self.flush_every = flush_every
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def partition_path(self, day):
+        return os.path.join(self.directory, f"date={day.isoformat()}")
+
+    def partitions(self, first_day, last_day):
+        """Partitions existantes entre deux dates incluses, dans l'ordre chronologique"""
+        first, last = f"date={first_day.isoformat()}", f"date={last_day.isoformat()}"
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith('date='))
+        return [os.path.join(self.directory, name) for name in names if first <= name <= last]
+
+    def append(self, timestamp, listeners, mobile_percent, engagement):
+        """Ajoute un point ; écrit le lot quand il est plein ou qu'on change de jour"""
+        with self._lock:
+            new_day = bool(self._buffer) and self._buffer[-1][0].date() != timestamp.date()
+            # Le point est gardé même si l'écriture qui suit échoue
+            self._buffer.append((timestamp, listeners, mobile_percent, engagement))
+            if len(self._buffer) > self.max_buffer:
+                dropped = len(self._buffer) - self.max_buffer
+                del self._buffer[:dropped]
+                logger.warning("Historique %s : %d point(s) non écrit(s) abandonné(s)", self.directory, dropped)
+            if new_day or len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Écrit le tampon, un lot par jour ; les points d'un lot en échec y restent"""
+        while self._buffer:
+            day = self._buffer[0][0].date()
+            size = next((i for i, point in enumerate(self._buffer) if point[0].date() != day), len(self._buffer))
+            batch = self._buffer[:size]
+            partition = self.partition_path(day)
+            os.makedirs(partition, exist_ok=True)
+            frame = pd.DataFrame(batch, columns=self.COLUMNS)
+            frame['timestamp'] = frame['timestamp'].astype('datetime64[ns]')
+            path = os.path.join(partition, f"part-{batch[0][0]:%H%M%S%f}.parquet")
+            self.write_table(pa.Table.from_pandas(frame, preserve_index=False), path)
+            del self._buffer[:size]
+            
+            # Le jour précédent est terminé : ses lots sont regroupés en un seul fichier
+            previous = self.partition_path(day - timedelta(days=1))
+            if os.path.isdir(previous) and len(self.partition_files(previous)) > 1:
+                self.compact(previous)
+
+    @staticmethod
+    def write_table(table, path):
+        temporary = path + '.tmp'
+        try:
+            pq.write_table(table, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            # Pas de fichier partiel laissé derrière (disque plein...)
+            with contextlib.suppress(OSError):
+                os.remove(temporary)
+            raise
+
+    @staticmethod
+    def partition_files(partition):
+        """Fichiers écrits d'une partition (les `.tmp` en cours d'écriture sont ignorés)"""
+        return sorted(os.path.join(partition, name) for name in os.listdir(partition) if name.endswith('.parquet'))
+
+    def read_files(self, files, filters=None):
+        """Colonnes de l'historique des fichiers donnés (sans colonnes déduites des noms de dossiers)"""
+        return pq.read_table(files, columns=list(self.COLUMNS), filters=filters, partitioning=None, memory_map=True)
+
+    def compact(self, partition):
+        with self._compact_lock:
+            parts = self.partition_files(partition)
+            table = self.read_files(parts).sort_by('timestamp')
+            self.write_table(table, os.path.join(partition, 'data.parquet'))
+            for part in parts:
+                if not part.endswith('data.parquet'):
+                    os.remove(part)
+
+    def read_partition(self, partition, filters):
+        """Table filtrée d'une partition, None si elle est vide ou illisible.
+
+        La lecture se fait sans verrou ; si un regroupement a supprimé un lot
+        entre le listage et la lecture, on reliste et relit en attendant la fin
+        du regroupement. Les doublons éventuels sont retirés par `read_range`.
+        """
+        try:
+            files = self.partition_files(partition)
+            return self.read_files(files, filters) if files else None
+        except (FileNotFoundError, pa.ArrowInvalid):
+            pass
+        with self._compact_lock:
+            try:
+                files = self.partition_files(partition)
+                return self.read_files(files, filters) if files else None
+            except (FileNotFoundError, pa.ArrowInvalid) as error:
+                logger.warning("Partition %s illisible, ignorée : %s", partition, error)
+                return None
+
+    def read_range(self, start, end=None):
+        """Points entre `start` et `end` (maintenant par défaut), lus partition par partition"""
+        end = end or datetime.now()
+        filters = [('timestamp', '>=', pd.Timestamp(start)), ('timestamp', '<=', pd.Timestamp(end))]
+        frames = []
+        for partition in self.partitions(start.date(), end.date()):
+            table = self.read_partition(partition, filters)
+            if table is not None:
+                frames.append(table.to_pandas())
+        with self._lock:
+            buffered = [row for row in self._buffer if start <= row[0] <= end]
+        if buffered:
+            frames.append(pd.DataFrame(buffered, columns=self.COLUMNS))
+        if not frames:
+            return pd.DataFrame(columns=self.COLUMNS)
+        history = pd.concat(frames, ignore_index=True)
+        history['timestamp'] = history['timestamp'].astype('datetime64[ns]')
+        return history.drop_duplicates('timestamp').sort_values('timestamp', ignore_index=True)
+
+def build_history_store(station_number):
+    """Historique persistant de la station si FREEDOM_HISTORY_DIR est défini"""
+    root = os.environ.get('FREEDOM_HISTORY_DIR')
+    if not root:
+        return None
+    store = ParquetHistoryStore(root, station_number)
+    atexit.register(store.flush)
+    return store
+
+# Grille des programmes par défaut, à côté du script
+PROGRAMME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programme.csv')
+
+# Émission affichée sur un créneau absent de la grille
+UNSCHEDULED_SHOW = {
+    'name': 'FREEDOM NON STOP',
+    'host': 'PLAYLIST AUTOMATISÉE',
+    'start_time': '00:00',
+    'end_time': '24:00',
+    'engagement': 65
+}
+
+# Jours (ISO, lundi = 1) correspondant aux mots-clés de la colonne `jours`
+PROGRAMME_DAYS = {'tous': range(1, 8), 'semaine': range(1, 6), 'weekend': range(6, 8)}
+
+class ProgrammeGrid:
+    """Grille des programmes indexée par intervalles, par station.
+
+    La grille hebdomadaire est découpée en intervalles [début, fin) exprimés en
+    minutes depuis lundi 00:00, triés et sans chevauchement : l'émission à un
+    instant donné se trouve par bisection, en O(log n). Les émissions
+    spéciales (colonne `date`) remplacent la grille habituelle ce jour-là sur
+    leur créneau. `label` étiquette d'un coup tout un tableau d'horodatages.
+    Une station absente de la grille n'a aucune émission (indice -1).
+    """
+
+    MINUTES_PER_DAY = 24 * 60
+    MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+    def __init__(self, rows):
+        self.shows = {}      # station -> liste des émissions
+        self.weekly = {}     # station -> (débuts, fins, indices d'émission) triés
+        self.specials = {}   # station -> {date: (débuts, fins, indices)} en minutes du jour
+        weekly, specials = {}, {}
+        for row in rows:
+            station = int(row['station'])
+            shows = self.shows.setdefault(station, [])
+            shows.append({
+                'name': row['emission'],
+                'host': row['animateur'],
+                'start_time': row['debut'],
+                'end_time': row['fin'],
+                'engagement': int(row['engagement'])
+            })
+            show_id = len(shows) - 1
+            start, end = self.parse_minutes(row['debut']), self.parse_minutes(row['fin'])
+            if row.get('date'):
+                day = datetime.strptime(row['date'], '%Y-%m-%d').date()
+                days = specials.setdefault(station, {})
+                if end > start:
+                    days.setdefault(day, []).append((start, end, show_id))
+                else:
+                    # Spéciale de nuit : la fin se place le lendemain
+                    days.setdefault(day, []).append((start, self.MINUTES_PER_DAY, show_id))
+                    if end > 0:
+                        days.setdefault(day + timedelta(days=1), []).append((0, end, show_id))
+                continue
+            intervals = weekly.setdefault(station, [])
+            for weekday in self.parse_days(row['jours']):
+                day_start = (weekday - 1) * self.MINUTES_PER_DAY
+                if end > start:
+                    intervals.append((day_start + start, day_start + end, show_id))
+                else:
+                    # Émission de nuit : on la coupe à minuit (dimanche -> lundi en fin de semaine)
+                    intervals.append((day_start + start, day_start + self.MINUTES_PER_DAY, show_id))
+                    next_day = (weekday % 7) * self.MINUTES_PER_DAY
+                    intervals.append((next_day, next_day + end, show_id))
+        self.empty_index = self.build_index([])
+        for station, intervals in weekly.items():
+            self.weekly[station] = self.build_index(intervals)
+        for station, days in specials.items():
+            self.specials[station] = {day: self.build_index(intervals) for day, intervals in days.items()}
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            return cls(list(csv.DictReader(csv_file)))
+
+    @staticmethod
+    def parse_minutes(value):
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+
+    @staticmethod
+    def parse_days(value):
+        """`tous`, `semaine`, `weekend` ou jours ISO : `1-5`, `6,7`"""
+        value = value.strip().lower()
+        if value in PROGRAMME_DAYS:
+            return list(PROGRAMME_DAYS[value])
+        days = []
+        for part in value.split(','):
+            first, _, last = part.partition('-')
+            days.extend(range(int(first), int(last or first) + 1))
+        return days
+
+    @staticmethod
+    def build_index(intervals):
+        intervals = sorted(intervals)
+        for (_, previous_end, _), (start, _, _) in zip(intervals, intervals[1:]):
+            if start < previous_end:
+                raise ValueError(f"Grille des programmes : créneaux qui se chevauchent (minute {start})")
+        return (
+            np.array([start for start, _, _ in intervals], dtype=np.int64),
+            np.array([end for _, end, _ in intervals], dtype=np.int64),
+            np.array([show_id for _, _, show_id in intervals], dtype=np.int64)
+        )
+
+    @staticmethod
+    def lookup(index, minutes):
+        """Indices d'émission pour des minutes (scalaire ou tableau), -1 hors grille"""
+        starts, ends, show_ids = index
+        if not len(starts):
+            return np.full(np.shape(minutes), -1, dtype=np.int64)
+        positions = np.searchsorted(starts, minutes, side='right') - 1
+        found = (positions >= 0) & (minutes < ends[np.maximum(positions, 0)])
+        return np.where(found, show_ids[np.maximum(positions, 0)], -1)
+
+    def show_id_at(self, station_number, moment):
+        minute_of_day = moment.hour * 60 + moment.minute
+        special = self.specials.get(station_number, {}).get(moment.date())
+        if special is not None:
+            show_id = int(self.lookup(special, minute_of_day))
+            if show_id >= 0:
+                return show_id
+        minute_of_week = moment.weekday() * self.MINUTES_PER_DAY + minute_of_day
+        return int(self.lookup(self.weekly.get(station_number, self.empty_index), minute_of_week))
+
+    def show_at(self, station_number, moment):
+        """Émission diffusée à l'instant `moment` (dict), None hors grille"""
+        show_id = self.show_id_at(station_number, moment)
+        return self.shows[station_number][show_id] if show_id >= 0 else None
+
+    def label(self, station_number, timestamps):
+        """Indice d'émission (dans `shows[station]`) pour chaque horodatage, vectorisé"""
+        timestamps = pd.DatetimeIndex(timestamps)
+        minute_of_day = (timestamps.hour * 60 + timestamps.minute).to_numpy(dtype=np.int64)
+        minute_of_week = timestamps.weekday.to_numpy(dtype=np.int64) * self.MINUTES_PER_DAY + minute_of_day
+        show_ids = self.lookup(self.weekly.get(station_number, self.empty_index), minute_of_week)
+        dates = timestamps.date
+        for day, index in self.specials.get(station_number, {}).items():
+            on_day = dates == day
+            if on_day.any():
+                special_ids = self.lookup(index, minute_of_day[on_day])
+                show_ids[on_day] = np.where(special_ids >= 0, special_ids, show_ids[on_day])
+        return show_ids
+
+@functools.lru_cache(maxsize=None)
+def get_programme_grid(path=None):
+    """Grille des programmes chargée une seule fois (FREEDOM_PROGRAMME ou programme.csv)"""
+    return ProgrammeGrid.from_csv(path or os.environ.get('FREEDOM_PROGRAMME', PROGRAMME_PATH))
+
+class CommuneAudience(Mapping):
+    """Audience par commune stockée dans un vecteur NumPy indexé par commune.
+
+    Le total, les parts et le classement sont recalculés une fois par mise à
+    jour (opérations vectorisées), pas à chaque rendu. La classe reste un
+    Mapping commune -> auditeurs pour le code qui lit `geo_data` comme un dict.
+    """
+
+    def __init__(self, counts):
+        self.names = tuple(counts)
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self.counts = np.array([counts[name] for name in self.names], dtype=np.int64)
+        self.refresh()
+
+    def refresh(self):
+        """Recalcule total, parts (%) et ordre décroissant après une modification des comptes"""
+        self.total = int(self.counts.sum())
+        self.shares = self.counts * (100.0 / self.total) if self.total else np.zeros(len(self.counts))
+        self.order = np.argsort(-self.counts, kind='stable')
+
+    def __getitem__(self, name):
+        return int(self.counts[self.positions[name]])
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def top(self, k):
+        """Les `k` premières communes : liste de (commune, auditeurs, part en %)"""
+        return [(self.names[i], int(self.counts[i]), float(self.shares[i])) for i in self.order[:k]]
+
+    def set_counts(self, commune_counts):
+        """Remplace les comptes des communes connues (les autres sont ignorées)"""
+        for name, count in commune_counts.items():
+            position = self.positions.get(name)
+            if position is not None:
+                self.counts[position] = count
+        self.refresh()
+
+    def random_walk(self, rng, volatility=0.05, floor=500):
+        """Légères variations aléatoires de toutes les communes en une opération vectorisée"""
+        amplitude = (self.counts * volatility).astype(np.int64)
+        variation = rng.integers(-amplitude, amplitude, endpoint=True)
+        np.maximum(self.counts + variation, floor, out=self.counts)
+        self.refresh()
+
+    def copy(self):
+        audience = copy.copy(self)
+        audience.counts = self.counts.copy()
+        return audience
+
+class ShowAnalytics:
+    """Statistiques d'audience par émission, calculées sur l'historique.
+
+    Chaque point de l'historique est étiqueté avec son émission (grille
+    vectorisée), puis découpé en diffusions : suites de points consécutifs de
+    la même émission. Moyenne, pic et engagement par diffusion sont obtenus
+    par agrégations groupées NumPy (bincount / reduceat), sans boucle par
+    point. Les rapports sont mis en cache par (station, émission, date) et
+    version de l'historique.
+    """
+
+    def __init__(self, grid, max_cache_entries=256):
+        self.grid = grid
+        self.max_cache_entries = max_cache_entries
+        self._cache = {}
+
+    def occurrences(self, station_number, history, max_gap=timedelta(hours=1)):
+        """Une ligne par diffusion : émission, début, fin, moyenne, pic, engagement, points"""
+        timestamps = np.asarray(history['timestamp'])
+        if len(timestamps) == 0:
+            return pd.DataFrame(columns=['show_id', 'start', 'end', 'avg_listeners',
+                                         'peak_listeners', 'avg_engagement', 'points'])
+        listeners = np.asarray(history['listeners'], dtype=np.float64)
+        engagement = np.asarray(history['engagement'], dtype=np.float64)
+        show_ids = self.grid.label(station_number, timestamps)
+        
+        # Nouvelle diffusion quand l'émission change ou après un trou dans les données
+        boundaries = np.ones(len(timestamps), dtype=bool)
+        boundaries[1:] = (show_ids[1:] != show_ids[:-1]) | (np.diff(timestamps) > np.timedelta64(max_gap))
+        starts = np.flatnonzero(boundaries)
+        group = np.cumsum(boundaries) - 1
+        points = np.bincount(group)
+        ends = np.append(starts[1:], len(timestamps)) - 1
+        return pd.DataFrame({
+            'show_id': show_ids[starts],
+            'start': timestamps[starts],
+            'end': timestamps[ends],
+            'avg_listeners': np.bincount(group, weights=listeners) / points,
+            'peak_listeners': np.maximum.reduceat(listeners, starts),
+            'avg_engagement': np.bincount(group, weights=engagement) / points,
+            'points': points
+        })
+
+    def retention(self, history, start, end=None):
+        """Audience de la diffusion relative à son premier point (%), par minute écoulée"""
+        timestamps = np.asarray(history['timestamp'])
+        first = np.searchsorted(timestamps, np.datetime64(start, 'ns'), side='left')
+        last = len(timestamps) if end is None else np.searchsorted(timestamps, np.datetime64(end, 'ns'), side='right')
+        listeners = np.asarray(history['listeners'][first:last], dtype=np.float64)
+        offsets = (timestamps[first:last] - timestamps[first]) / np.timedelta64(1, 'm') if last > first else np.array([])
+        retention = listeners / listeners[0] * 100 if len(listeners) else listeners
+        return offsets, retention
+
+    def report(self, station_number, history, moment, weeks=4, version=None):
+        """Rapport de l'émission en cours : diffusion actuelle, courbes et comparaison hebdomadaire"""
+        show_id = self.grid.show_id_at(station_number, moment)
+        key = (station_number, show_id, moment.date(), version)
+        if version is not None and key in self._cache:
+            return self._cache[key]
+        
+        occurrences = self.occurrences(station_number, history)
+        same_show = occurrences[occurrences['show_id'] == show_id]
+        current = same_show.iloc[-1] if len(same_show) else None
+        if current is not None and moment - current['end'] > timedelta(hours=1):
+            current = None  # dernière diffusion ancienne : l'émission vient de commencer
+        past = same_show.iloc[:-1] if current is not None else same_show
+        
+        # Courbe de la diffusion en cours et courbe moyenne des diffusions précédentes
+        current_curve = self.retention(history, current['start']) if current is not None else (np.array([]), np.array([]))
+        curves = [self.retention(history, row.start, row.end) for row in past.itertuples()]
+        if curves:
+            offsets = np.concatenate([curve[0] for curve in curves])
+            values = np.concatenate([curve[1] for curve in curves])
+            average_curve = pd.Series(values).groupby(offsets).mean()
+            average_curve = (average_curve.index.to_numpy(), average_curve.to_numpy())
+        else:
+            average_curve = (np.array([]), np.array([]))
+        
+        # Comparaison d'une semaine à l'autre
+        recent = same_show[same_show['start'] >= np.datetime64(moment - timedelta(weeks=weeks), 'ns')]
+        weekly = recent.groupby(recent['start'].dt.to_period('W').dt.start_time).agg(
+            avg_listeners=('avg_listeners', 'mean'),
+            peak_listeners=('peak_listeners', 'max'),
+            broadcasts=('points', 'size')
+        )
+        
+        report = {
+            'show_id': show_id,
+            'current': current,
+            'current_curve': current_curve,
+            'average_curve': average_curve,
+            'weekly': weekly
+        }
+        if version is not None:
+            if len(self._cache) >= self.max_cache_entries:
+                self._cache.clear()
+            self._cache[key] = report
+        return report
+
+@functools.lru_cache(maxsize=None)
+def get_show_analytics():
+    """Analyse par émission partagée (le cache sert à toutes les sessions)"""
+    return ShowAnalytics(get_programme_grid())
+
+# Catalogue des titres simulés (artistes populaires à La Réunion) : artiste, titre, poids de diffusion
+TRACK_CATALOGUE = {
+    1: [
+        ('GABRIEL ZACCAI', 'LA RÉUNION', 45),
+        ('KAF MARON', 'MARMITE', 42),
+        ('DANYÈL WARO', 'SOMMIN KARÉ', 38),
+        ('ZISKAKAN', 'BOUT D\'MON ÎLE', 35),
+        ('NATHALIE NATIEMBÉ', 'KASKAS NOU LA', 32),
+        ('BASTERS', 'MAMY LAO', 30),
+        ('GRUP LÉLÉ', 'SÉGA TROIS FLEURS', 28),
+        ('LOÏC BENJAMIN', 'DANMON LÉVÉ', 25)
+    ],
+    # Freedom 2 - plus de variété internationale
+    2: [
+        ('DAVID GUETTA', 'I\'M GOOD', 48),
+        ('MILEY CYRUS', 'FLOWERS', 42),
+        ('SIA', 'UNSTOPPABLE', 39),
+        ('THE WEEKND', 'BLINDING LIGHTS', 36),
+        ('DUA LIPA', 'DANCE THE NIGHT', 34),
+        ('ED SHEERAN', 'EYES CLOSED', 31),
+        ('KAF MARON', 'LA ROUTE DU BONHEUR', 28),
+        ('GABRIEL ZACCAI', 'MON ÎLE ADORÉE', 26)
+    ],
+}
+SIMULATED_PLAYS_PER_HOUR = 16
+
+# Fenêtres glissantes du classement des titres (secondes)
+TRACK_WINDOWS = {'1 h': 3600, '24 h': 24 * 3600, '7 j': 7 * 24 * 3600}
+DEFAULT_TRACK_WINDOW = '24 h'
+TOP_TRACKS_SIZE = 8
+
+class SlidingPlayCounter:
+    """Diffusions par titre sur une fenêtre glissante et sur la fenêtre précédente.
+
+    Chaque diffusion entre dans une file ordonnée par horodatage et incrémente
+    le compte de son titre (O(1)). En vieillissant, elle passe de la fenêtre
+    courante à la fenêtre précédente, puis sort : l'expiration coûte O(1)
+    amorti par diffusion et les comptes retombés à zéro sont supprimés, la
+    mémoire reste bornée par les diffusions de deux fenêtres.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.current = {}
+        self.previous = {}
+        self._current_plays = deque()
+        self._previous_plays = deque()
+
+    def add(self, timestamp, key):
+        self._current_plays.append((timestamp, key))
+        self.current[key] = self.current.get(key, 0) + 1
+
+    @staticmethod
+    def _decrement(counts, key):
+        count = counts[key] - 1
+        if count:
+            counts[key] = count
+        else:
+            del counts[key]
+
+    def expire(self, now):
+        cutoff = now - self.window
+        while self._current_plays and self._current_plays[0][0] < cutoff:
+            play = self._current_plays.popleft()
+            self._decrement(self.current, play[1])
+            self._previous_plays.append(play)
+            self.previous[play[1]] = self.previous.get(play[1], 0) + 1
+        cutoff -= self.window
+        while self._previous_plays and self._previous_plays[0][0] < cutoff:
+            self._decrement(self.previous, self._previous_plays.popleft()[1])
+
+    @staticmethod
+    def ranking(counts, n=None):
+        """Titres du plus diffusé au moins diffusé (égalités départagées par artiste et titre)"""
+        if n is None:
+            return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return heapq.nsmallest(n, counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def top(self, n):
+        """Les `n` titres les plus diffusés, avec la tendance tirée de leur rang précédent.
+
+        'new' : absent de la fenêtre précédente ; 'up' / 'down' / 'stable' selon
+        l'évolution du rang d'une fenêtre à l'autre.
+        """
+        previous_ranks = {key: rank for rank, (key, _) in enumerate(self.ranking(self.previous), 1)}
+        tracks = []
+        for rank, ((artist, title), plays) in enumerate(self.ranking(self.current, n), 1):
+            previous_rank = previous_ranks.get((artist, title))
+            if previous_rank is None:
+                trend = 'new'
+            elif previous_rank > rank:
+                trend = 'up'
+            elif previous_rank < rank:
+                trend = 'down'
+            else:
+                trend = 'stable'
+            tracks.append({
+                'artist': artist, 'title': title, 'plays': plays, 'trend': trend,
+                'rank': rank, 'previous_rank': previous_rank
+            })
+        return tracks
+
+class TrackChart:
+    """Classements glissants des titres diffusés (dernière heure, 24 h, 7 jours).
+
+    Alimenté diffusion par diffusion depuis le log de diffusion (ou la
+    simulation) ; les comptes sont exacts, le volume d'une antenne (quelques
+    milliers de diffusions par semaine) ne justifiant pas d'estimation.
+    """
+
+    def __init__(self, windows=TRACK_WINDOWS):
+        self.counters = {label: SlidingPlayCounter(seconds) for label, seconds in windows.items()}
+        self.latest = None
+
+    def add(self, timestamp, artist, title):
+        """Compte une diffusion (horodatage en secondes epoch)"""
+        # Les files restent ordonnées : une diffusion en retard est rangée à la dernière date vue
+        if self.latest is not None and timestamp < self.latest:
+            timestamp = self.latest
+        self.latest = timestamp
+        key = (artist, title)
+        for counter in self.counters.values():
+            counter.add(timestamp, key)
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        for counter in self.counters.values():
+            counter.expire(now)
+
+    def tops(self, n=TOP_TRACKS_SIZE):
+        """Classement de chaque fenêtre : {libellé: [titres]}"""
+        return {label: counter.top(n) for label, counter in self.counters.items()}
+
+class AudienceModel:
+    """Données d'audience d'une station : live, communes, émission, titres, historique.
+
+    Sans store, le modèle simule ses propres données ; avec un store partagé,
+    il ne fait que charger les snapshots publiés. Le dashboard Streamlit en
+    hérite pour l'affichage, le service HTTP et le store l'utilisent tel quel.
+    """
+
+    def __init__(self, station_number=1, history_hours=48, resolution_minutes=10, seed=None, store=None,
+                 history_store=None):
+        self.station_number = station_number
+        self.current_time = datetime.now()
+        self.history_hours = history_hours
+        self.resolution_minutes = resolution_minutes
+        self.rng = np.random.default_rng(seed)
+        self.history_store = history_store
+        self.downsampling = 'rollup'  # ou 'lttb'
+        
+        # Avec un store partagé, le modèle ne simule rien : il lit les snapshots
+        self.store = store
+        if store is None:
+            self.initialize_real_data()
+        else:
+            self.load_snapshot(store.snapshot(station_number))
+        
+    def initialize_real_data(self):
+        """Initialise les données réelles de Freedom Radio Réunion"""
+        
+        # Données historiques récentes (fenêtre configurable, 48h par défaut)
+        capacity = self.history_hours * 60 // self.resolution_minutes + 1
+        initial_history = self.load_initial_history()
+        self.history = AudienceRingBuffer(capacity)
+        self.history.extend(initial_history)
+        
+        # Agrégats multi-résolution pour les graphiques longue durée
+        self.rollups = AudienceRollups()
+        self.rollups.extend(initial_history)
+        
+        # Données en temps réel basées sur les audiences réelles
+        if self.station_number == 1:
+            # Freedom 1 - audience plus large
+            self.live_data = {
+                'current_listeners': 85600,
+                'peak_today': 112000,
+                'trend': 'up',
+                'mobile_listeners': 68,
+                'car_listeners': 25,
+                'home_listeners': 7,
+                'last_change': 0
+            }
+        else:
+            # Freedom 2 - audience plus jeune
+            self.live_data = {
+                'current_listeners': 72300,
+                'peak_today': 89000,
+                'trend': 'stable',
+                'mobile_listeners': 75,
+                'car_listeners': 18,
+                'home_listeners': 7,
+                'last_change': 0
+            }
+        
+        # Audience de référence vers laquelle la marche aléatoire revient
+        self.reference_listeners = self.live_data['current_listeners']
+        
+        # Programme actuel réel basé sur la grille des programmes
+        self.select_current_show()
+
+        # Classement des titres : diffusions simulées jusqu'au branchement d'un log de diffusion
+        self.track_chart = TrackChart()
+        self.last_simulated_play = None
+        self.simulate_plays()
+        self.refresh_top_tracks()
+        
+        # Prévision des prochaines heures, apprise sur l'historique
+        self.forecaster = SeasonalForecaster()
+        self.refresh_forecast()
+        
+        # Flux social (simulé sans store ; avec le store, flux partagé par toutes les sessions)
+        self.social_feed = SocialFeed()
+        self.social_source = SimulatedSocialSource()
+        self.social_source.prime(self.social_feed)
+        
+        # Répartition par commune de départ (estimation), remplacée par des comptes
+        # mesurés quand une source localise les auditeurs (`set_geo_data`)
+        self.geo_measured = False
+        self.geo_data = CommuneAudience({
+            'Saint-Denis': 21500,
+            'Saint-Pierre': 18200,
+            'Saint-Paul': 15600,
+            'Saint-Leu': 6400,
+            'Le Tampon': 14200,
+            'Saint-Louis': 9800,
+            'Le Port': 8600,
+            'Saint-Joseph': 7200,
+            'Saint-André': 6800,
+            'Saint-Benoît': 6100,
+            'Bras-Panon': 3800,
+            'La Plaine-des-Palmistes': 1500,
+            'Saint-Philippe': 2900,
+            'Sainte-Marie': 5200,
+            'Sainte-Suzanne': 4800,
+            'Sainte-Rose': 3200,
+            'Les Avirons': 4100,
+            'Entre-Deux': 3500,
+            'Étang-Salé': 3900,
+            'Petite-Île': 3400,
+            'La Possession': 7500,
+            'Salazie': 1800,
+            'Cilaos': 1600,
+            'Trois-Bassins': 2700
+        })
+
+    def select_current_show(self):
+        """Sélectionne l'émission en cours selon la grille des programmes"""
+        show = get_programme_grid().show_at(self.station_number, datetime.now()) or UNSCHEDULED_SHOW
+        self.current_show = dict(show, listeners=self.live_data['current_listeners'])
+
+    def load_initial_history(self):
+        """Historique de départ : la dernière fenêtre persistée, sinon des données générées"""
+        if self.history_store is not None:
+            stored = self.history_store.read_range(datetime.now() - timedelta(hours=self.history_hours))
+            if len(stored):
+                return stored
+        return self.generate_historical_data()
+
+    def generate_historical_data(self, hours=None, resolution_minutes=None):
+        """Génère des données historiques réalistes (vectorisé avec NumPy)
+
+        Par défaut : les dernières 48 heures, un point toutes les 10 minutes.
+        La fenêtre et la résolution sont configurables (ex. 30 jours à la minute).
+        """
+        hours = self.history_hours if hours is None else hours
+        resolution_minutes = self.resolution_minutes if resolution_minutes is None else resolution_minutes
+
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours)
+        timestamps = pd.date_range(start_time, end_time, freq=f'{resolution_minutes}min')
+        n_points = len(timestamps)
+
+        # Variation circadienne réaliste pour La Réunion (table heure -> base)
+        hours_of_day = timestamps.hour.to_numpy()
+        base = HOURLY_BASE_LISTENERS[hours_of_day]
+        low = HOURLY_VARIATION_LOW[hours_of_day]
+        high = HOURLY_VARIATION_HIGH[hours_of_day]
+        base_listeners = base + self.rng.integers(low, high, endpoint=True)
+
+        # Ajustement selon la station
+        if self.station_number == 2:
+            base_listeners = (base_listeners * 0.85).astype(np.int64)  # Freedom 2 légèrement moins d'audience
+
+        # Bruit aléatoire
+        noise = self.rng.integers(-3000, 3000, size=n_points, endpoint=True)
+        listeners = np.maximum(base_listeners + noise, 15000)
+
+        return pd.DataFrame({
+            'timestamp': timestamps,
+            'listeners': listeners,
+            'hour': hours_of_day,
+            'mobile_percent': self.rng.integers(65, 75, size=n_points, endpoint=True),
+            'engagement': self.rng.integers(70, 88, size=n_points, endpoint=True)
+        })
+
+    @property
+    def historical_data(self):
+        """Historique complet sous forme de DataFrame (copie)"""
+        return self.history.to_frame()
+
+    def record_history_point(self):
+        """Ajoute le point live à l'historique quand un pas de résolution est écoulé"""
+        now = datetime.now()
+        last_timestamp = self.history.last_timestamp()
+        if last_timestamp is not None and now - last_timestamp < timedelta(minutes=self.resolution_minutes):
+            return
+        
+        point = (now, self.live_data['current_listeners'], self.live_data['mobile_listeners'],
+                 self.current_show['engagement'])
+        self.history.append(*point)
+        self.rollups.add(now, self.live_data['current_listeners'], self.current_show['engagement'])
+        if self.history_store is not None:
+            self.history_store.append(*point)
+
+    def history_range(self, start, end=None):
+        """Colonnes de l'historique entre `start` et `end` (maintenant par défaut).
+
+        Vues sur le tampon circulaire si la période y tient, sinon lecture de la
+        seule plage nécessaire dans l'historique persistant.
+        """
+        first_timestamp = self.history.first_timestamp()
+        if self.history_store is None or (first_timestamp is not None and first_timestamp <= start):
+            return self.history.between(start, end)
+        stored = self.history_store.read_range(start, end)
+        return {name: stored[name].to_numpy() for name in stored.columns}
+
+    def chart_series(self, start, end=None, max_points=MAX_CHART_POINTS):
+        """Séries à tracer entre `start` et `end`, dans la limite de `max_points` points.
+
+        Points bruts s'ils tiennent dans le budget ; sinon sous-échantillonnage
+        LTTB, ou palier d'agrégats le plus fin qui tient dans le budget (moyenne
+        et bande min/max des auditeurs).
+        """
+        duration = (end or datetime.now()) - start
+        if duration / timedelta(minutes=self.resolution_minutes) <= max_points:
+            return self.history_range(start, end)
+        
+        if self.downsampling == 'lttb':
+            raw = self.history_range(start, end)
+            kept = lttb_indices(raw['timestamp'].astype(np.int64), raw['listeners'], max_points)
+            return {name: values[kept] for name, values in raw.items()}
+        
+        tier = self.rollups.select_tier(duration, max_points)
+        if self.rollups.covers(tier, start):
+            aggregated = self.rollups.tiers[tier].between(start, end)
+        else:
+            raw = pd.DataFrame(self.history_range(start, end))
+            if raw.empty:
+                return self.history_range(start, end)
+            aggregated = aggregate_history(raw, self.rollups.TIERS[tier][0])
+        return {
+            'timestamp': np.asarray(aggregated['timestamp']),
+            'listeners': np.asarray(aggregated['listeners_mean']),
+            'listeners_min': np.asarray(aggregated['listeners_min']),
+            'listeners_max': np.asarray(aggregated['listeners_max']),
+            'engagement': np.asarray(aggregated['engagement_mean'])
+        }
+
+    def load_snapshot(self, snapshot):
+        """Charge un snapshot publié par le store partagé (lecture seule)"""
+        self.live_data = snapshot['live_data']
+        self.geo_data = snapshot['geo_data']
+        self.geo_measured = snapshot['geo_measured']
+        self.current_show = snapshot['current_show']
+        self.top_tracks = snapshot['top_tracks']
+        self.top_tracks_by_window = snapshot['top_tracks_by_window']
+        self.social_feed = snapshot['social_feed']
+        self.forecast = snapshot['forecast']
+        self.expected_listeners = snapshot['expected_listeners']
+        self.history = snapshot['history']
+        self.history_store = snapshot['history_store']
+        self.rollups = snapshot['rollups']
+
+    def refresh_live_data(self):
+        """Rafraîchit les données live : snapshot partagé si disponible, sinon simulation locale"""
+        if self.store is not None:
+            self.load_snapshot(self.store.snapshot(self.station_number))
+        else:
+            self.update_live_data()
+            self.simulate_plays()
+            self.refresh_top_tracks()
+            self.social_source.step(self.social_feed)
+            self.refresh_forecast()
+
+    def update_live_data(self):
+        """Met à jour les données en temps réel avec des variations réalistes"""
+        # Cible et volatilité selon l'heure (morning show, journée, retour, prime time, nuit)
+        current_hour = datetime.now().hour
+        base_factor = HOURLY_TARGET_FACTOR[current_hour]
+        volatility = HOURLY_VOLATILITY[current_hour]
+        
+        # Mise à jour des auditeurs : l'état persiste entre les reruns, on revient
+        # donc progressivement vers la cible horaire au lieu de la multiplier à chaque appel
+        current_listeners = self.live_data['current_listeners']
+        target = self.reference_listeners * base_factor
+        noise = random.randint(-int(current_listeners * volatility), int(current_listeners * volatility))
+        new_listeners = max(int(current_listeners + 0.3 * (target - current_listeners) + noise), 15000)
+        self.set_current_listeners(new_listeners)
+        
+        # Mise à jour des données géographiques (légères variations)
+        self.geo_data.random_walk(self.rng, volatility=0.05, floor=500)
+
+    def simulate_plays(self, now=None):
+        """Diffusions simulées depuis l'appel précédent (deux fenêtres de 7 jours au premier appel)"""
+        now = time.time() if now is None else now
+        start = self.last_simulated_play
+        if start is None:
+            start = now - 2 * max(TRACK_WINDOWS.values())
+        interval = 3600 / SIMULATED_PLAYS_PER_HOUR
+        count = int((now - start) // interval)
+        if count <= 0:
+            return
+        catalogue = TRACK_CATALOGUE.get(self.station_number, TRACK_CATALOGUE[2])
+        weights = np.array([weight for _, _, weight in catalogue], dtype=np.float64)
+        picks = self.rng.choice(len(catalogue), size=count, p=weights / weights.sum())
+        for position, pick in enumerate(picks.tolist(), 1):
+            artist, title, _ = catalogue[pick]
+            self.record_play(start + position * interval, artist, title)
+        self.last_simulated_play = start + count * interval
+
+    def record_play(self, timestamp, artist, title):
+        """Compte une diffusion dans le classement des titres"""
+        self.track_chart.add(timestamp, artist, title)
+
+    def refresh_top_tracks(self):
+        """Recalcule les classements de chaque fenêtre (fait vieillir les diffusions)"""
+        self.track_chart.expire()
+        self.top_tracks_by_window = self.track_chart.tops()
+        self.top_tracks = self.top_tracks_by_window[DEFAULT_TRACK_WINDOW]
+
+    def refresh_forecast(self, now=None):
+        """Prévision depuis maintenant, recalée sur l'audience live (profil réappris au plus tous les quarts d'heure).
+
+        L'apprentissage couvre les `FORECAST_FIT_DAYS` derniers jours, lus dans
+        l'historique persistant quand le tampon en mémoire ne remonte pas si loin.
+        """
+        now = now or datetime.now()
+        if self.forecaster.needs_refit(now):
+            history = self.history_range(now - timedelta(days=FORECAST_FIT_DAYS), now)
+            self.forecaster.fit(history['timestamp'], history['listeners'], now)
+        self.forecast = self.forecaster.predict(
+            now, hours=FORECAST_HOURS, step_minutes=self.resolution_minutes,
+            current=self.live_data['current_listeners']
+        )
+        self.expected_listeners = self.forecaster.expected(now)
+
+    def set_current_listeners(self, new_listeners):
+        """Enregistre un nouveau nombre d'auditeurs (simulé ou mesuré) et met à jour pic et tendance"""
+        change = new_listeners - self.live_data['current_listeners']
+        
+        self.live_data['current_listeners'] = new_listeners
+        self.live_data['last_change'] = change
+        
+        # L'émission en cours peut avoir changé depuis le dernier rerun
+        self.select_current_show()
+        
+        # Mise à jour du pic (remis à zéro au changement de jour)
+        now = datetime.now()
+        if now.date() != self.current_time.date():
+            self.live_data['peak_today'] = new_listeners
+        self.current_time = now
+        if new_listeners > self.live_data['peak_today']:
+            self.live_data['peak_today'] = new_listeners
+        
+        # Mise à jour de la tendance
+        if change > 500:
+            self.live_data['trend'] = 'up'
+        elif change < -500:
+            self.live_data['trend'] = 'down'
+        else:
+            self.live_data['trend'] = 'stable'
+
+    def set_geo_data(self, commune_counts):
+        """Remplace les comptes par commune par des valeurs mesurées"""
+        self.geo_data.set_counts(commune_counts)
+        self.geo_measured = True
+
+class AudienceSource:
+    """Source de données d'audience branchée derrière le modèle.
+
+    Une source fait avancer `live_data` / `geo_data` du modèle producteur à
+    chaque pas du store partagé. Les implémentations surchargent `update`.
+    """
+
+    async def update(self, model):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class SimulatedAudienceSource(AudienceSource):
+    """Source par défaut : marche aléatoire autour du profil horaire"""
+
+    async def update(self, model):
+        model.update_live_data()
+
+class IcecastStatusSource(AudienceSource):
+    """Interroge la page `status-json.xsl` d'un serveur Icecast.
+
+    La connexion HTTP est gardée ouverte (keep-alive) entre deux interrogations
+    et la requête bloquante tourne hors de la boucle asyncio. En cas d'échec,
+    les interrogations suivantes sont espacées (backoff exponentiel avec gigue)
+    jusqu'à `max_backoff` secondes. La page ne donne que des totaux : la
+    répartition par commune reste l'estimation de départ, signalée comme
+    simulée (`geo_measured` faux).
+    """
+
+    def __init__(self, status_url, mounts=None, timeout=5.0, base_backoff=5.0, max_backoff=300.0):
+        parts = urlsplit(status_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.path = (parts.path or '/status-json.xsl') + (f"?{parts.query}" if parts.query else '')
+        self.mounts = set(mounts) if mounts else None
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.last_error = None
+        self._connection = None
+
+    def fetch_status(self):
+        """Requête HTTP bloquante sur la connexion persistante"""
+        if self._connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._connection = connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self._connection.request('GET', self.path, headers={'Connection': 'keep-alive'})
+            response = self._connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close_connection()
+            raise
+        if response.status != 200:
+            raise http.client.HTTPException(f"status-json.xsl a répondu {response.status}")
+        return json.loads(body)
+
+    def count_listeners(self, status):
+        """Somme des auditeurs des points de montage suivis"""
+        sources = status.get('icestats', {}).get('source', [])
+        if isinstance(sources, dict):  # Icecast renvoie un objet seul s'il n'y a qu'un point de montage
+            sources = [sources]
+        total = 0
+        for source in sources:
+            mount = urlsplit(source.get('listenurl', '')).path
+            if self.mounts is None or mount in self.mounts:
+                total += int(source.get('listeners', 0))
+        return total
+
+    async def update(self, model):
+        now = time.monotonic()
+        if now < self.next_attempt:
+            return
+        try:
+            status = await asyncio.to_thread(self.fetch_status)
+        except (OSError, http.client.HTTPException, ValueError) as error:
+            self.failures += 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (self.failures - 1))
+            self.next_attempt = now + delay * random.uniform(0.5, 1.0)
+            self.last_error = str(error)
+            return
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.last_error = None
+        model.set_current_listeners(self.count_listeners(status))
+
+    def close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self):
+        self.close_connection()
+
+class LogTailer:
+    """Lit uniquement les octets ajoutés à un fichier de log depuis la lecture précédente.
+
+    L'offset est conservé entre deux lectures ; une rotation (changement
+    d'inode ou fichier tronqué) fait repartir du début du nouveau fichier.
+    À la première ouverture, la lecture commence en fin de fichier sauf si
+    `from_start` est demandé.
+    """
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.from_start = from_start
+        self.offset = None
+        self.size = 0
+        self.inode = None
+        self._partial = b''
+
+    @property
+    def caught_up(self):
+        return self.offset is not None and self.offset >= self.size
+
+    def read_chunk(self, max_bytes=None):
+        """Octets ajoutés depuis le dernier appel, coupés après la dernière fin de ligne.
+
+        `max_bytes` borne la lecture pour rattraper un gros fichier par morceaux ;
+        la fin de ligne incomplète est gardée pour l'appel suivant.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return b''
+        if self.offset is None:
+            self.inode = stat.st_ino
+            self.offset = 0 if self.from_start else stat.st_size
+        elif stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode = stat.st_ino
+            self.offset = 0
+            self._partial = b''
+        self.size = stat.st_size
+        available = stat.st_size - self.offset
+        if available <= 0:
+            return b''
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self.offset)
+            data = log_file.read(available if max_bytes is None else min(available, max_bytes))
+        self.offset += len(data)
+        data = self._partial + data
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        return data[:end]
+
+    def read_lines(self, max_bytes=None):
+        """Lignes complètes ajoutées depuis le dernier appel (bytes, sans fin de ligne)"""
+        chunk = self.read_chunk(max_bytes)
+        return chunk.split(b'\n')[:-1] if chunk else []
+
+class AccessLogSource(AudienceSource):
+    """Compte les auditeurs à partir d'un log d'accès Icecast/nginx (format combined).
+
+    Chaque ligne décrit une session [t - durée, t] : t est l'horodatage de
+    la ligne et la durée le dernier champ quand il est présent (log
+    d'Icecast, `$request_time` ajouté au format nginx). Une requête courte
+    (segment HLS, durée absente ou inférieure à `active_window`) garde le
+    client à l'écoute `active_window` secondes après t, le temps du segment
+    suivant. Une connexion longue n'est écrite qu'à la déconnexion : sa
+    session est déjà terminée et ne compte pas dans l'audience courante.
+    Pour les flux Icecast en continu, l'audience en direct vient donc de
+    status-json.xsl ou des rappels listener_add / listener_remove ; ce log ne
+    suffit que pour les flux segmentés (HLS). `locate` associe
+    optionnellement une adresse IP à une commune pour alimenter `geo_data`.
+    """
+
+    LINE_PATTERN = re.compile(
+        rb'^(?P<ip>\S+) \S+ \S+ \[(?P<time>[^\]]*)\] "(?:GET|HEAD) (?P<path>\S+)[^"]*" (?P<status>\d{3}) '
+        rb'\S+(?: "[^"]*" "[^"]*")?(?: (?P<duration>\d+(?:\.\d+)?))?\s*$'
+    )
+    TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+    def __init__(self, path, mounts=None, active_window=60, locate=None, from_start=False):
+        self.tailer = LogTailer(path, from_start=from_start)
+        self.mounts = [mount.encode() for mount in mounts] if mounts else None
+        self.active_window = active_window
+        self.locate = locate
+        self.listening_until = {}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def parse_time(raw):
+        """Horodatage du log en secondes epoch (les lignes d'une même seconde partagent la conversion)"""
+        return datetime.strptime(raw.decode('ascii'), AccessLogSource.TIME_FORMAT).timestamp()
+
+    def ingest(self, lines):
+        for line in lines:
+            match = self.LINE_PATTERN.match(line)
+            if match is None or not match.group('status').startswith(b'2'):
+                continue
+            if self.mounts is not None and not match.group('path').startswith(tuple(self.mounts)):
+                continue
+            try:
+                end = self.parse_time(match.group('time'))
+            except (UnicodeDecodeError, ValueError):
+                continue
+            duration = float(match.group('duration') or 0)
+            # Session [end - durée, end] ; une requête courte laisse le client à l'écoute jusqu'au segment suivant
+            until = end + self.active_window if duration <= self.active_window else end
+            ip = match.group('ip').decode()
+            if until > self.listening_until.get(ip, until - 1):
+                self.listening_until[ip] = until
+
+    def active_clients(self, now=None):
+        """Clients dont la session couvre `now` ; les sessions terminées sont oubliées"""
+        now = time.time() if now is None else now
+        self.listening_until = {ip: until for ip, until in self.listening_until.items() if until >= now}
+        return list(self.listening_until)
+
+    async def update(self, model):
+        lines = await asyncio.to_thread(self.tailer.read_lines)
+        self.ingest(lines)
+        clients = self.active_clients()
+        model.set_current_listeners(len(clients))
+        if self.locate is not None:
+            commune_counts = dict.fromkeys(model.geo_data, 0)
+            for ip in clients:
+                commune = self.locate(ip)
+                if commune in commune_counts:
+                    commune_counts[commune] += 1
+            model.set_geo_data(commune_counts)
+
+def ip_to_int(ip):
+    """Adresse IPv4 (str ou bytes) vers entier, None si invalide ou IPv6"""
+    if isinstance(ip, bytes):
+        ip = ip.decode('ascii', 'replace')
+    try:
+        return int.from_bytes(socket.inet_aton(ip), 'big')
+    except OSError:
+        return None
+
+class CommuneIPIndex:
+    """Index de plages IPv4 -> commune, préchargé une fois et trié.
+
+    Les plages ne se chevauchent pas ; la recherche d'une adresse est une
+    bisection sur les débuts de plage, en O(log n).
+    """
+
+    def __init__(self, ranges):
+        ranges = sorted(ranges)
+        self.starts = [start for start, _, _ in ranges]
+        self.ends = [end for _, end, _ in ranges]
+        self.communes = [commune for _, _, commune in ranges]
+
+    @classmethod
+    def from_csv(cls, path):
+        """Charge un CSV `debut,fin,commune` (adresses IPv4 pointées), en-tête facultatif"""
+        ranges = []
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            for row in csv.reader(csv_file):
+                if len(row) < 3:
+                    continue
+                start, end = ip_to_int(row[0].strip()), ip_to_int(row[1].strip())
+                if start is None or end is None:
+                    continue  # en-tête ou ligne invalide
+                ranges.append((start, end, row[2].strip()))
+        return cls(ranges)
+
+    def lookup(self, ip):
+        """Commune de l'adresse, None si elle n'appartient à aucune plage"""
+        value = ip_to_int(ip)
+        if value is None:
+            return None
+        position = bisect.bisect_right(self.starts, value) - 1
+        if position >= 0 and value <= self.ends[position]:
+            return self.communes[position]
+        return None
+
+class ListenerSessionSource(AudienceSource):
+    """Auditeurs connectés reconstitués à partir d'un journal de connexions.
+
+    Icecast n'écrit pas ce journal lui-même : avec l'authentification URL
+    (`<authentication type="url">`), il envoie à chaque connexion et
+    déconnexion un POST au format formulaire, que le point de réception
+    recopie tel quel, un corps par ligne (horodatage en tête facultatif) :
+
+        action=listener_add&server=radio&port=8000&client=1842&mount=%2Ffreedom1&user=&pass=&ip=102.35.4.17&agent=VLC
+        action=listener_remove&server=radio&port=8000&client=1842&mount=%2Ffreedom1&user=&pass=&duration=754&ip=102.35.4.17&agent=VLC
+
+    Le format champ par champ d'un hook maison est aussi accepté :
+
+        2025-10-06T07:12:03 listener_add client=1842 ip=102.35.4.17 mount=/freedom1
+
+    Seuls les octets ajoutés sont lus (offset suivi, par morceaux bornés), les
+    événements sont extraits du morceau entier par une regex compilée et une
+    table des sessions ouvertes tient à jour, de façon incrémentale, le total
+    d'auditeurs et les comptes par commune. Le fichier est relu depuis le début
+    au démarrage pour reconstituer les sessions en cours, jamais ensuite.
+
+    Un `listener_remove` perdu ne doit pas gonfler l'audience indéfiniment :
+    une session plus vieille que `max_session_age` secondes (depuis
+    l'horodatage de la ligne, sinon depuis sa lecture) est close, et la table
+    est vidée quand les identifiants de client repartent de zéro
+    (redémarrage d'Icecast). Le cache adresse -> commune est borné (LRU).
+    """
+
+    # Chemin rapide : champs dans l'ordre canonique client/ip/mount ; sinon le
+    # reste de la ligne (corps de formulaire compris) est analysé champ par champ
+    EVENT_PATTERN = re.compile(
+        rb'^(?:(\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d)\S*[ \t]+)?[^\n]*?listener_(add|remove)'
+        rb'(?: client=(\S+) ip=(\S+) mount=(\S+)[ \t\r]*$|([^\n]*))',
+        re.MULTILINE
+    )
+    FIELD_PATTERN = re.compile(rb'(?<![^\s&])(client|ip|mount)=([^\s&]+)')
+
+    def __init__(self, path, communes, ip_index=None, mounts=None, max_session_age=24 * 3600,
+                 ip_cache_size=65536, chunk_size=8 * 1024 * 1024, max_bytes_per_update=256 * 1024 * 1024):
+        self.tailer = LogTailer(path, from_start=True)
+        self.communes = list(communes)
+        self.commune_positions = {commune: position for position, commune in enumerate(self.communes)}
+        self.commune_counts = [0] * len(self.communes)
+        self.ip_index = ip_index
+        self.mounts = {mount.encode() for mount in mounts} if mounts else None
+        self.max_session_age = max_session_age
+        self.chunk_size = chunk_size
+        self.max_bytes_per_update = max_bytes_per_update
+        self.sessions = {}  # clé client -> (position de la commune ou -1, début en secondes epoch)
+        self.listeners = 0
+        self.last_client_id = 0
+        # Cache adresse -> position de la commune, borné : les logs couvrent des millions d'adresses
+        self.locate_position = functools.lru_cache(maxsize=ip_cache_size)(self._locate_position)
+
+    def _locate_position(self, ip):
+        return self.commune_positions.get(self.ip_index.lookup(ip), -1)
+
+    def locate(self, ip):
+        if self.ip_index is None or ip is None:
+            return -1
+        return self.locate_position(ip)
+
+    def reset(self):
+        """Oublie toutes les sessions ouvertes"""
+        self.sessions = {}
+        self.commune_counts = [0] * len(self.communes)
+        self.listeners = 0
+
+    def restarted(self, client):
+        """Vrai si l'identifiant de client révèle un redémarrage (compteur d'Icecast remis à zéro)"""
+        if not client.isdigit():
+            return False
+        client_id = int(client)
+        # Les rappels peuvent arriver légèrement dans le désordre : seul un net retour en arrière compte
+        restart = client_id * 2 < self.last_client_id and self.last_client_id - client_id > 16
+        self.last_client_id = client_id if restart else max(self.last_client_id, client_id)
+        return restart
+
+    def expire(self, now):
+        """Clôt les sessions ouvertes depuis plus de `max_session_age` secondes"""
+        cutoff = now - self.max_session_age
+        # Parcours complet (une table de la taille de l'audience simultanée) : les
+        # horodatages des lignes ne sont pas forcément dans l'ordre d'ouverture
+        expired = [key for key, (_, started) in self.sessions.items() if started < cutoff]
+        for key in expired:
+            position, _ = self.sessions.pop(key)
+            self.listeners -= 1
+            if position >= 0:
+                self.commune_counts[position] -= 1
+
+    def ingest(self, chunk, now=None):
+        """Applique les événements de connexion/déconnexion d'un morceau de log"""
+        now = time.time() if now is None else now
+        counts = self.commune_counts
+        mounts = self.mounts
+        for stamp, action, client, ip, mount, rest in self.EVENT_PATTERN.findall(chunk):
+            if rest:
+                fields = dict(self.FIELD_PATTERN.findall(rest))
+                client, ip, mount = fields.get(b'client'), fields.get(b'ip'), fields.get(b'mount')
+                # Valeurs encodées dans les corps de formulaire (%2F, %3A en IPv6)
+                if mount is not None and b'%' in mount:
+                    mount = unquote_to_bytes(mount)
+                if ip is not None and b'%' in ip:
+                    ip = unquote_to_bytes(ip)
+            if mounts is not None and mount not in mounts:
+                continue
+            if not client and not ip:
+                # Événement sans client ni adresse : impossible à apparier, ignoré
+                continue
+            key = client or (ip, mount)
+            if action == b'add':
+                if client and self.restarted(client):
+                    self.reset()
+                    counts = self.commune_counts
+                if key in self.sessions:
+                    continue
+                started = now
+                if stamp:
+                    with contextlib.suppress(ValueError):
+                        started = datetime.fromisoformat(stamp.decode('ascii')).timestamp()
+                position = self.locate(ip)
+                self.sessions[key] = (position, started)
+                self.listeners += 1
+                if position >= 0:
+                    counts[position] += 1
+            else:
+                session = self.sessions.pop(key, None)
+                if session is None:
+                    continue
+                self.listeners -= 1
+                if session[0] >= 0:
+                    counts[session[0]] -= 1
+
+    def read_pending(self):
+        """Lit et applique les octets en attente, dans la limite du budget par mise à jour"""
+        budget = self.max_bytes_per_update
+        while budget > 0:
+            chunk = self.tailer.read_chunk(min(self.chunk_size, budget))
+            now = time.time()
+            self.ingest(chunk, now)
+            self.expire(now)
+            budget -= self.chunk_size
+            if self.tailer.caught_up:
+                break
+
+    async def update(self, model):
+        await asyncio.to_thread(self.read_pending)
+        model.set_current_listeners(self.listeners)
+        if self.ip_index is not None:
+            model.set_geo_data(dict(zip(self.communes, self.commune_counts)))
+
+def build_audience_source(station_number, communes=()):
+    """Source d'audience de la station selon l'environnement.
+
+    FREEDOM<n>_ICECAST_STATUS_URL : URL de status-json.xsl
+    FREEDOM<n>_SESSION_LOG : journal listener_add / listener_remove à suivre
+    FREEDOM<n>_ACCESS_LOG : chemin du log d'accès à suivre
+    FREEDOM<n>_MOUNTS : points de montage suivis, séparés par des virgules
+    FREEDOM_IP_RANGES : CSV des plages IPv4 par commune
+    Sans configuration, la simulation est utilisée.
+    """
+    prefix = f"FREEDOM{station_number}_"
+    mounts = [mount.strip() for mount in os.environ.get(prefix + 'MOUNTS', '').split(',') if mount.strip()]
+    ip_index = CommuneIPIndex.from_csv(os.environ['FREEDOM_IP_RANGES']) if os.environ.get('FREEDOM_IP_RANGES') else None
+    if os.environ.get(prefix + 'ICECAST_STATUS_URL'):
+        return IcecastStatusSource(os.environ[prefix + 'ICECAST_STATUS_URL'], mounts=mounts)
+    if os.environ.get(prefix + 'SESSION_LOG'):
+        return ListenerSessionSource(os.environ[prefix + 'SESSION_LOG'], communes, ip_index=ip_index, mounts=mounts)
+    if os.environ.get(prefix + 'ACCESS_LOG'):
+        locate = ip_index.lookup if ip_index is not None else None
+        return AccessLogSource(os.environ[prefix + 'ACCESS_LOG'], mounts=mounts, locate=locate)
+    return SimulatedAudienceSource()
+
+# Formats d'horodatage acceptés dans les logs en plus de l'ISO 8601 et de l'epoch
+TIME_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y%m%d%H%M%S')
+
+def parse_epoch(value):
+    """Horodatage ISO, jj/mm/aaaa hh:mm[:ss] ou epoch vers secondes epoch (None si illisible)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        pass
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, time_format).timestamp()
+        except ValueError:
+            continue
+    return None
+
+class SimulatedPlayLog(AudienceSource):
+    """Diffusions simulées à partir du catalogue de la station"""
+
+    async def update(self, model):
+        model.simulate_plays()
+
+class PlayLogSource(AudienceSource):
+    """Log de diffusion (as-run) de l'automate d'antenne, une diffusion par entrée.
+
+    Les champs sont reconnus par leur nom, en français ou en anglais ; les
+    entrées dont le type n'est pas un titre musical (jingle, pub, flash...)
+    sont ignorées. Au premier passage, le classement simulé de démarrage est
+    remplacé par celui du log.
+    """
+
+    FIELD_ALIASES = {
+        'timestamp': ('timestamp', 'horodatage', 'datetime', 'date', 'start', 'debut', 'début', 'airtime'),
+        'artist': ('artist', 'artiste', 'interprete', 'interprète', 'performer'),
+        'title': ('title', 'titre'),
+        'type': ('type', 'category', 'categorie', 'catégorie', 'kind'),
+    }
+    MUSIC_TYPES = {'', 'music', 'musique', 'song', 'titre', 'track'}
+
+    def __init__(self, path):
+        self.path = path
+        self.replaced_simulation = False
+        self.field_names = {
+            alias: field for field, aliases in self.FIELD_ALIASES.items() for alias in aliases
+        }
+
+    def parse_play(self, fields):
+        """(horodatage, artiste, titre) d'une entrée {nom: valeur}, None si ce n'est pas une diffusion"""
+        play = {}
+        for name, value in fields.items():
+            field = self.field_names.get(name.strip().lower())
+            if field is not None and value is not None:
+                play.setdefault(field, value.strip())
+        if not play.get('artist') or not play.get('title') or not play.get('timestamp'):
+            return None
+        if play.get('type', '').lower() not in self.MUSIC_TYPES:
+            return None
+        timestamp = parse_epoch(play['timestamp'])
+        if timestamp is None:
+            return None
+        return timestamp, play['artist'].upper(), play['title'].upper()
+
+    def read_plays(self):
+        raise NotImplementedError
+
+    async def update(self, model):
+        plays = await asyncio.to_thread(self.read_plays)
+        if not self.replaced_simulation:
+            model.track_chart = TrackChart()
+            self.replaced_simulation = True
+        for timestamp, artist, title in plays:
+            model.record_play(timestamp, artist, title)
+
+class CSVPlayLog(PlayLogSource):
+    """Log de diffusion CSV (séparateur `;` ou `,`), suivi en fin de fichier.
+
+    Une ligne d'en-tête nomme les colonnes ; sans en-tête, l'ordre
+    horodatage, artiste, titre[, type] est supposé. Le fichier est lu depuis
+    le début au démarrage pour remplir les fenêtres du classement.
+    """
+
+    DEFAULT_COLUMNS = ('timestamp', 'artist', 'title', 'type')
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.tailer = LogTailer(path, from_start=True)
+        self.columns = self.DEFAULT_COLUMNS
+
+    def read_plays(self):
+        plays = []
+        for line in self.tailer.read_lines():
+            text = line.decode('utf-8', 'replace').strip()
+            if not text:
+                continue
+            row = next(csv.reader([text], delimiter=';' if ';' in text else ','))
+            if any(self.field_names.get(value.strip().lower()) == 'title' for value in row):
+                self.columns = tuple(row)
+                continue
+            play = self.parse_play(dict(zip(self.columns, row)))
+            if play is not None:
+                plays.append(play)
+        return plays
+
+class XMLPlayLog(PlayLogSource):
+    """Log de diffusion XML, relu quand le fichier change.
+
+    Toute balise portant un artiste et un titre (en attributs ou en balises
+    enfants) est une diffusion ; seules les diffusions plus récentes que la
+    dernière déjà comptée sont retenues à chaque relecture.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.signature = None
+        self.last_timestamp = None
+
+    def read_plays(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return []
+        try:
+            root = ElementTree.parse(self.path).getroot()
+        except ElementTree.ParseError:
+            return []  # fichier en cours d'écriture : relu au passage suivant
+        self.signature = signature
+
+        plays = []
+        for element in root.iter():
+            fields = {child.tag: child.text for child in element if len(child) == 0}
+            fields.update(element.attrib)
+            play = self.parse_play(fields)
+            if play is not None and (self.last_timestamp is None or play[0] > self.last_timestamp):
+                plays.append(play)
+        plays.sort()
+        if plays:
+            self.last_timestamp = plays[-1][0]
+        return plays
+
+def build_play_log(station_number):
+    """Source des diffusions de la station : FREEDOM<n>_PLAYLOG (.xml ou CSV), sinon la simulation"""
+    path = os.environ.get(f"FREEDOM{station_number}_PLAYLOG")
+    if not path:
+        return SimulatedPlayLog()
+    if path.lower().endswith('.xml'):
+        return XMLPlayLog(path)
+    return CSVPlayLog(path)
+
+# Flux social simulé (contenu réunionnais) : utilisateur, message, ancienneté (minutes), j'aime
+SIMULATED_SOCIAL_MESSAGES = [
+    ("Marie_StDenis", "Le Réveil Freedom meilleur réveil de l'île ! 🌅 #FreedomReunion", 2, 42),
+    ("Kevin974", "En écoutant Freedom dans les bouchons vers St-Pierre 🚗🎵", 4, 38),
+    ("Sarah_Tampon", "Qui va au concert de Kaf Maron ce week-end ? 🙋‍♀️", 7, 29),
+    ("Zoreil974", "Découvert Gabriel Zaccai grâce à Freedom, quelle voix ! 🎤", 12, 51),
+    ("Reunion_Addict", "Le son de Baster passe trop en ce moment sur Freedom !", 15, 33),
+    ("Metro_Lontan", "Freedom, la seule radio qui parle vraiment à tous les réunionnais 💙", 18, 47)
+]
+SIMULATED_SOCIAL_USERS = ["Ti_Creole", "Fan_De_Maloya", "StPierre_Radio", "Freedom4Ever", "Reunion_Sega"]
+SIMULATED_SOCIAL_POSTS = [
+    "La playlist de ce matin est trop bien ! 🎧",
+    "Jean-Marc trop drôle dans le Réveil Freedom 😂",
+    "Qui écoute Freedom au boulot ? 👷‍♀️",
+    "Freedom devrait organiser un concert à Cilaos ! 🎤",
+    "Le maloya de Danyèl Waro, quel chef-d'œuvre 🎶"
+]
+
+class SocialFeed:
+    """Derniers messages des réseaux sociaux, partagés par toutes les sessions.
+
+    Les messages sont gardés dans une file bornée (les plus anciens sortent),
+    dédoublonnés par identifiant, y compris après leur sortie de la file dans
+    la limite de `seen_capacity` identifiants. Les « j'aime » donnés depuis le
+    dashboard sont comptés à part, conservés d'un rendu à l'autre et
+    optionnellement enregistrés dans `likes_path` (JSON).
+    """
+
+    def __init__(self, capacity=50, seen_capacity=5000, likes_path=None):
+        self.messages = deque(maxlen=capacity)
+        self.seen = {}  # identifiants reçus, dans l'ordre d'arrivée
+        self.seen_capacity = seen_capacity
+        self.likes = {}
+        self.likes_path = likes_path
+        self.version = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        if likes_path is not None and os.path.exists(likes_path):
+            with open(likes_path, encoding='utf-8') as likes_file:
+                self.likes = {str(key): int(count) for key, count in json.load(likes_file).items()}
+
+    @staticmethod
+    def normalize(raw):
+        """Message {'id', 'user', 'message', 'timestamp', 'likes'} à partir d'un objet reçu (None si invalide)"""
+        try:
+            user = str(raw.get('user') or raw.get('author') or '').strip()
+            text = ' '.join(str(raw.get('message') or raw.get('text') or '').split())
+            if not user or not text:
+                return None
+            timestamp = parse_epoch(raw['timestamp']) if raw.get('timestamp') is not None else None
+            timestamp = time.time() if timestamp is None else timestamp
+            message_id = raw.get('id')
+            if message_id is None:
+                # Sans identifiant fourni, le contenu identifie le message
+                message_id = hashlib.blake2b(f"{user}\n{timestamp}\n{text}".encode(), digest_size=8).hexdigest()
+            return {
+                'id': str(message_id),
+                'user': user,
+                'message': text,
+                'timestamp': timestamp,
+                'likes': int(raw.get('likes') or 0),
+            }
+        except (TypeError, ValueError, AttributeError):  # objet non dict, champ mal typé
+            return None
+
+    def add(self, raw):
+        """Ajoute un message reçu ; False s'il est invalide ou déjà reçu"""
+        message = self.normalize(raw)
+        if message is None:
+            return False
+        with self._lock:
+            if message['id'] in self.seen:
+                return False
+            self.seen[message['id']] = None
+            if len(self.seen) > self.seen_capacity:
+                del self.seen[next(iter(self.seen))]
+            if len(self.messages) == self.messages.maxlen:
+                self.likes.pop(self.messages[-1]['id'], None)
+            self.messages.appendleft(message)
+            self.version += 1
+        return True
+
+    def like(self, message_id):
+        """Un « j'aime » de plus sur un message encore dans le flux"""
+        with self._lock:
+            if not any(message['id'] == message_id for message in self.messages):
+                return False
+            self.likes[message_id] = self.likes.get(message_id, 0) + 1
+            self.version += 1
+            self._dirty = True
+        return True
+
+    def recent(self, n):
+        """Les `n` derniers messages (copies), « j'aime » du dashboard compris"""
+        with self._lock:
+            return [
+                dict(message, likes=message['likes'] + self.likes.get(message['id'], 0))
+                for message in itertools.islice(self.messages, n)
+            ]
+
+    def save_likes(self):
+        """Enregistre les « j'aime » s'ils ont changé (écriture atomique)"""
+        if self.likes_path is None or not self._dirty:
+            return
+        with self._lock:
+            likes = dict(self.likes)
+            self._dirty = False
+        temporary_path = self.likes_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as likes_file:
+            json.dump(likes, likes_file)
+        os.replace(temporary_path, self.likes_path)
+
+class SocialSource:
+    """Source de messages branchée derrière le flux social (voir AudienceSource)"""
+
+    def prime(self, feed):
+        """Messages disponibles dès la création du flux, avant le premier pas du store"""
+
+    async def update(self, feed):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class SimulatedSocialSource(SocialSource):
+    """Messages simulés : le flux de départ, puis un nouveau message de temps en temps"""
+
+    def __init__(self, probability=0.3):
+        self.probability = probability
+        self.posted = 0
+
+    def prime(self, feed, now=None):
+        now = time.time() if now is None else now
+        for position, (user, text, age, likes) in enumerate(reversed(SIMULATED_SOCIAL_MESSAGES)):
+            feed.add({'id': f"sim-{position}", 'user': user, 'message': text,
+                      'timestamp': now - age * 60, 'likes': likes})
+        self.posted = max(self.posted, len(SIMULATED_SOCIAL_MESSAGES))
+
+    def step(self, feed, now=None):
+        now = time.time() if now is None else now
+        if random.random() < self.probability:
+            feed.add({'id': f"sim-{self.posted}", 'user': random.choice(SIMULATED_SOCIAL_USERS),
+                      'message': random.choice(SIMULATED_SOCIAL_POSTS), 'timestamp': now,
+                      'likes': random.randint(15, 45)})
+            self.posted += 1
+
+    async def update(self, feed):
+        self.step(feed)
+
+class JSONLinesSocialSource(SocialSource):
+    """Messages lus dans un fichier JSON Lines (un objet par ligne), suivi en fin de fichier.
+
+    Le fichier est alimenté par le collecteur des réseaux sociaux ; il est lu
+    depuis le début au démarrage, les doublons étant écartés par identifiant.
+    """
+
+    def __init__(self, path):
+        self.tailer = LogTailer(path, from_start=True)
+
+    def read_messages(self):
+        messages = []
+        for line in self.tailer.read_lines():
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(raw, dict):
+                messages.append(raw)
+        return messages
+
+    async def update(self, feed):
+        for raw in await asyncio.to_thread(self.read_messages):
+            feed.add(raw)
+
+class WebhookSocialSource(SocialSource):
+    """Boîte de réception d'un webhook : `receive` empile depuis n'importe quel thread, `update` vide.
+
+    Sert de point d'entrée aux intégrations qui poussent les messages, et aux
+    essais sans fichier ni réseau.
+    """
+
+    def __init__(self):
+        self.inbox = deque()
+
+    def receive(self, payload):
+        """Un message (dict) ou une liste de messages"""
+        self.inbox.extend(payload if isinstance(payload, list) else [payload])
+
+    async def update(self, feed):
+        while self.inbox:
+            feed.add(self.inbox.popleft())
+
+def build_social_source():
+    """Source du flux social : FREEDOM_SOCIAL_FEED (JSON Lines), sinon la simulation"""
+    if os.environ.get('FREEDOM_SOCIAL_FEED'):
+        return JSONLinesSocialSource(os.environ['FREEDOM_SOCIAL_FEED'])
+    return SimulatedSocialSource()
+
+class AudienceStore:
+    """Store d'audience partagé par toutes les sessions, pour les deux stations.
+
+    Un unique thread producteur, qui fait tourner sa propre boucle asyncio,
+    interroge les sources de données (simulation par défaut) des deux
+    stations en une seule passe, fait avancer les données live, les communes
+    et l'historique, puis publie après chaque pas un dict de snapshots
+    immuables (un par station). Les sessions lisent `snapshots` sans verrou :
+    la publication est une simple réaffectation de référence (copy-on-write),
+    atomique en CPython, et les deux stations sont toujours au même pas.
+    """
+
+    def __init__(self, station_numbers=STATIONS, interval=10, data_sources=None, play_logs=None,
+                 social_source=None, perf=None):
+        self.station_numbers = tuple(station_numbers)
+        self.interval = interval
+        self.perf = perf or PerfTimings()
+        # Les producteurs gardent 30 jours en mémoire pour les périodes longues du graphique
+        self.producers = {
+            number: AudienceModel(
+                number, history_hours=30 * 24, history_store=build_history_store(number)
+            )
+            for number in self.station_numbers
+        }
+        data_sources = data_sources or {}
+        self.data_sources = {
+            number: data_sources.get(number) or build_audience_source(number, producer.geo_data)
+            for number, producer in self.producers.items()
+        }
+        play_logs = play_logs or {}
+        self.play_logs = {number: play_logs.get(number) or build_play_log(number) for number in self.producers}
+        # Un seul flux social pour l'île, commun aux stations
+        self.social_feed = SocialFeed(likes_path=os.environ.get('FREEDOM_SOCIAL_LIKES') or None)
+        self.social_source = social_source or build_social_source()
+        self.social_source.prime(self.social_feed)
+        for producer in self.producers.values():
+            producer.social_feed = self.social_feed
+        self.version = 0
+        self.snapshots = self.build_snapshots()
+        # Services lancés dans la boucle du producteur (ex. API HTTP) : fabriques de coroutines
+        self.services = []
+        # Appelés dans la boucle du producteur avec les snapshots après chaque publication
+        self.on_publish = []
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+
+    def build_snapshot(self, producer):
+        """Copie l'état courant d'un producteur dans un nouveau snapshot"""
+        return {
+            'version': self.version,
+            'updated_at': datetime.now(),
+            'live_data': dict(producer.live_data),
+            'geo_data': producer.geo_data.copy(),
+            'geo_measured': producer.geo_measured,
+            'current_show': dict(producer.current_show),
+            'top_tracks': list(producer.top_tracks),
+            'top_tracks_by_window': dict(producer.top_tracks_by_window),
+            'social_feed': producer.social_feed,
+            'forecast': producer.forecast,
+            'expected_listeners': producer.expected_listeners,
+            'history': producer.history.frozen(),
+            'history_store': producer.history_store,
+            'rollups': producer.rollups.frozen()
+        }
+
+    def build_snapshots(self):
+        """Snapshots de toutes les stations pour un même pas"""
+        self.version += 1
+        return {number: self.build_snapshot(producer) for number, producer in self.producers.items()}
+
+    def snapshot(self, station_number):
+        """Dernier snapshot publié pour une station"""
+        return self.snapshots[station_number]
+
+    def island_listeners(self):
+        """Auditeurs de toutes les stations, lus dans une même publication"""
+        snapshots = self.snapshots
+        return sum(snapshot['live_data']['current_listeners'] for snapshot in snapshots.values())
+
+    async def tick(self):
+        """Fait avancer toutes les stations d'un pas et publie les nouveaux snapshots"""
+        with self.perf.section('store.sources'):
+            # Une source en erreur est journalisée et sautée : elle n'arrête pas la boucle du store
+            sources = [
+                *((f"Freedom {number}", self.data_sources[number]) for number in self.producers),
+                *((f"playlog Freedom {number}", self.play_logs[number]) for number in self.producers),
+                ('flux social', self.social_source),
+            ]
+            results = await asyncio.gather(
+                *(self.data_sources[number].update(producer) for number, producer in self.producers.items()),
+                *(self.play_logs[number].update(producer) for number, producer in self.producers.items()),
+                self.social_source.update(self.social_feed),
+                return_exceptions=True
+            )
+            for (name, source), result in zip(sources, results):
+                if isinstance(result, Exception):
+                    logger.error("Source %s (%s) en erreur : %r", name, type(source).__name__, result)
+                elif isinstance(result, BaseException):
+                    raise result
+        with self.perf.section('store.publish'):
+            # De même pour l'écriture de l'historique (disque plein...), la prévision
+            # et les abonnés : l'étape en erreur est journalisée, le snapshot publié
+            for number, producer in self.producers.items():
+                for step in (producer.record_history_point, producer.refresh_top_tracks, producer.refresh_forecast):
+                    self.guarded(f"Freedom {number} : {step.__name__}", step)
+            self.snapshots = self.build_snapshots()
+            for callback in self.on_publish:
+                self.guarded(f"abonné {getattr(callback, '__qualname__', callback)!s}", callback, self.snapshots)
+            self.guarded("sauvegarde des « j'aime »", self.social_feed.save_likes)
+
+    @staticmethod
+    def guarded(name, func, *args):
+        """Appelle `func(*args)` ; une erreur est journalisée au lieu d'interrompre le pas"""
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("%s en erreur", name)
+
+    async def run_async(self):
+        tasks = [asyncio.ensure_future(service()) for service in self.services]
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    # Un pas raté ne doit pas arrêter le thread producteur
+                    try:
+                        await self.tick()
+                    except Exception:
+                        logger.exception("Pas du store en erreur")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(*(source.close() for source in self.data_sources.values()))
+            await asyncio.gather(*(play_log.close() for play_log in self.play_logs.values()))
+            await self.social_source.close()
+
+    def open_loop(self):
+        # Boucle et événement créés avant le thread : stop() peut suivre start() sans attendre
+        self._loop = asyncio.new_event_loop()
+        self._stop_event = asyncio.Event()
+
+    def run(self):
+        """Fait tourner le producteur (et ses services) dans le thread courant jusqu'à stop()"""
+        if self._loop is None or self._loop.is_closed():
+            self.open_loop()
+        try:
+            self._loop.run_until_complete(self.run_async())
+        finally:
+            self._loop.close()
+
+    def start(self):
+        """Démarre le thread producteur (une seule fois)"""
+        if self._thread is None:
+            self.open_loop()
+            self._thread = threading.Thread(target=self.run, name="freedom-audience", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+            self._thread.join()
+            self._thread = None
+        for number, producer in self.producers.items():
+            if producer.history_store is not None:
+                self.guarded(f"Freedom {number} : écriture de l'historique", producer.history_store.flush)
+        self.guarded("sauvegarde des « j'aime »", self.social_feed.save_likes)
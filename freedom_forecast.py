@@ -0,0 +1,113 @@
+# freedom_forecast.py - prévision d'audience Freedom Radio Réunion
+# Profil saisonnier (jour et semaine) appris sur l'historique, plus un
+# résidu lissé ; utilisé par le modèle (freedom_audience.py) pour la bande de
+# prévision du graphique temps réel.
+from datetime import datetime
+
+import numpy as np
+
+class SeasonalForecaster:
+    """Prévision des prochaines heures : profil saisonnier + résidu lissé (EWMA).
+
+    Le profil journalier (moyenne par tranche de `bin_minutes`) et un facteur
+    par jour de semaine sont appris sur l'historique par agrégations NumPy
+    (bincount), au plus une fois par `refit_interval` secondes. Le résidu
+    (audience - profil) est lissé exponentiellement sur l'historique puis
+    recalé sur la valeur live ; il s'amortit avec l'horizon. La bande
+    (± `z` écarts-types des résidus récents) s'élargit avec l'horizon.
+    """
+
+    def __init__(self, bin_minutes=30, alpha=0.3, damping=0.7, z=1.28, refit_interval=900):
+        self.bin_minutes = bin_minutes
+        self.bins = 24 * 60 // bin_minutes
+        self.alpha = alpha
+        self.damping = damping  # part du résidu conservée par heure d'horizon
+        self.z = z  # 1.28 : bande à 80 %
+        self.refit_interval = refit_interval
+        self.daily = None
+        self.weekly = np.ones(7)
+        self.level = 0.0
+        self.sigma = 0.0
+        self.fitted_at = None
+
+    def needs_refit(self, now):
+        return self.fitted_at is None or (now - self.fitted_at).total_seconds() >= self.refit_interval
+
+    def slots(self, timestamps):
+        """(tranche du jour, jour de semaine lundi=0) de chaque horodatage"""
+        days = timestamps.astype('datetime64[D]')
+        minutes = (timestamps - days) // np.timedelta64(1, 'm')
+        return (minutes // self.bin_minutes).astype(np.int64), (days.astype(np.int64) + 3) % 7
+
+    def seasonal(self, timestamps):
+        bins, weekdays = self.slots(timestamps)
+        return self.daily[bins] * self.weekly[weekdays]
+
+    def fit(self, timestamps, listeners, now=None):
+        """Apprend profil, facteurs hebdomadaires, résidu et dispersion (False si historique vide)"""
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        listeners = np.asarray(listeners, dtype=np.float64)
+        self.fitted_at = now or datetime.now()
+        if len(timestamps) == 0:
+            self.daily = None
+            return False
+        bins, weekdays = self.slots(timestamps)
+
+        # Profil journalier ; les tranches sans données sont interpolées (de façon circulaire)
+        counts = np.bincount(bins, minlength=self.bins)
+        sums = np.bincount(bins, weights=listeners, minlength=self.bins)
+        known = np.flatnonzero(counts)
+        daily = np.divide(sums, counts, out=np.zeros(self.bins), where=counts > 0)
+        if len(known) < self.bins:
+            daily = np.interp(np.arange(self.bins), known, daily[known], period=self.bins)
+        self.daily = daily
+
+        # Facteur par jour de semaine (1 pour les jours absents de l'historique)
+        ratio = listeners / np.maximum(daily[bins], 1.0)
+        day_counts = np.bincount(weekdays, minlength=7)
+        self.weekly = np.divide(
+            np.bincount(weekdays, weights=ratio, minlength=7), day_counts, out=np.ones(7), where=day_counts > 0
+        )
+
+        # Résidu lissé (EWMA en une passe vectorisée) et dispersion sur le dernier jour
+        residuals = listeners - self.seasonal(timestamps)
+        weights = (1 - self.alpha) ** np.arange(len(residuals) - 1, -1, -1)
+        self.level = float(np.dot(weights, residuals) / weights.sum())
+        last_day = timestamps >= timestamps[-1] - np.timedelta64(1, 'D')
+        self.sigma = float(np.std(residuals[last_day]))
+        return True
+
+    def expected(self, timestamp):
+        """Audience attendue à `timestamp` selon le dernier ajustement, sans recalage live (None sans ajustement)"""
+        if self.daily is None:
+            return None
+        timestamp = np.datetime64(timestamp, 'ns')
+        hours = max((timestamp - np.datetime64(self.fitted_at, 'ns')) / np.timedelta64(1, 'h'), 0.0)
+        return float(self.seasonal(np.array([timestamp]))[0] + self.level * self.damping ** hours)
+
+    def predict(self, start, hours=6, step_minutes=10, current=None):
+        """Prévision de `start` à `start + hours` : {'timestamp', 'mean', 'lower', 'upper'} (None sans ajustement).
+
+        `current` (audience live) recale le résidu de départ ; le premier point
+        de la prévision est alors le point live lui-même.
+        """
+        if self.daily is None:
+            return None
+        start = np.datetime64(start, 'ns')
+        offsets = np.arange(0, hours * 60 + 1, step_minutes)
+        timestamps = start + offsets * np.timedelta64(1, 'm')
+        seasonal = self.seasonal(timestamps)
+        level = self.level
+        if current is not None:
+            level = self.alpha * (current - seasonal[0]) + (1 - self.alpha) * level
+        horizon = offsets / 60
+        mean = seasonal + level * self.damping ** horizon
+        half_width = self.z * self.sigma * np.sqrt(horizon)
+        if current is not None:
+            mean[0] = current
+        return {
+            'timestamp': timestamps,
+            'mean': mean,
+            'lower': np.maximum(mean - half_width, 0),
+            'upper': mean + half_width,
+        }
@@ -0,0 +1,310 @@
+# freedom_monitoring.py - monitoring technique de la diffusion Freedom Radio Réunion
+# Échantillonne la machine (CPU, réseau), les points de montage Icecast et
+# les émetteurs (sondes TCP/HTTP) dans la boucle du store partagé ; le
+# dashboard et l'API ne font que lire le dernier échantillon.
+import asyncio
+import contextlib
+from datetime import datetime
+import http.client
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from freedom_audience import STATIONS, AudienceRingBuffer, IcecastStatusSource
+
+try:  # psutil est facultatif : /proc suffit sous Linux
+    import psutil
+except ImportError:
+    psutil = None
+
+# Colonnes numériques conservées dans l'historique du monitoring (NaN si non mesuré)
+TECH_COLUMNS = ('cpu_percent', 'network_mbps', 'latency_ms', 'stream_quality', 'transmitters_up')
+
+# Émetteurs simulés quand FREEDOM_TRANSMITTERS n'est pas défini
+SIMULATED_TRANSMITTERS = 12
+
+class HostCollector:
+    """CPU et débit réseau sortant de la machine, en différence avec la mesure précédente.
+
+    psutil est utilisé s'il est installé, sinon /proc/stat et /proc/net/dev.
+    Une première mesure de référence est prise à la création.
+    """
+
+    def __init__(self):
+        self._cpu = None
+        self._network = None
+        self.measure()
+
+    @staticmethod
+    def read_cpu_times():
+        """(occupé, total) en ticks depuis le démarrage"""
+        with open('/proc/stat', encoding='ascii') as stat_file:
+            fields = [int(value) for value in stat_file.readline().split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+        total = sum(fields[:8])
+        return total - idle, total
+
+    @staticmethod
+    def read_bytes_sent():
+        """Octets émis par toutes les interfaces sauf la boucle locale"""
+        sent = 0
+        with open('/proc/net/dev', encoding='ascii') as dev_file:
+            for line in dev_file.readlines()[2:]:
+                interface, _, counters = line.partition(':')
+                if interface.strip() != 'lo':
+                    sent += int(counters.split()[8])
+        return sent
+
+    def measure(self):
+        now = time.monotonic()
+        metrics = {}
+        if psutil is not None:
+            metrics['cpu_percent'] = psutil.cpu_percent(interval=None)
+            sent = psutil.net_io_counters().bytes_sent
+        else:
+            try:
+                busy, total = self.read_cpu_times()
+                sent = self.read_bytes_sent()
+            except (OSError, ValueError, IndexError):
+                return metrics
+            if self._cpu is not None and total > self._cpu[1]:
+                metrics['cpu_percent'] = 100 * (busy - self._cpu[0]) / (total - self._cpu[1])
+            self._cpu = (busy, total)
+        if self._network is not None and now > self._network[0]:
+            metrics['network_mbps'] = (sent - self._network[1]) * 8 / (now - self._network[0]) / 1e6
+        self._network = (now, sent)
+        return metrics
+
+    async def collect(self):
+        return await asyncio.to_thread(self.measure)
+
+    async def close(self):
+        pass
+
+class IcecastMountCollector:
+    """État des points de montage Icecast des stations (status-json.xsl).
+
+    La qualité du flux est la part des points de montage suivis qui sont en
+    ligne (un serveur sans liste de points de montage compte pour un, en
+    ligne s'il diffuse au moins un flux) ; le débit servi est estimé par
+    débit nominal x auditeurs.
+
+    Chaque serveur a sa propre connexion, utilisée par une seule requête à la
+    fois : tant que la requête précédente n'est pas revenue (thread encore
+    bloqué après l'abandon de l'échantillon), le serveur n'est pas
+    réinterrogé et compte hors ligne. `timeout` (socket) reste sous celui du
+    monitoring pour que le thread rende la main avant l'échantillon suivant.
+    """
+
+    def __init__(self, servers, timeout=2.0):
+        # servers : [(URL de status-json.xsl, points de montage suivis ou None)]
+        self.servers = [(IcecastStatusSource(url, mounts=mounts, timeout=timeout), mounts) for url, mounts in servers]
+        self._pending = {}
+
+    @staticmethod
+    def online_mounts(source, mounts):
+        """Points de montage en ligne : chemin -> statistiques Icecast"""
+        status = source.fetch_status()
+        sources = status.get('icestats', {}).get('source', [])
+        if isinstance(sources, dict):  # Icecast renvoie un objet seul s'il n'y a qu'un point de montage
+            sources = [sources]
+        online = {urlsplit(stats.get('listenurl', '')).path: stats for stats in sources}
+        return online if not mounts else {mount: online[mount] for mount in mounts if mount in online}
+
+    async def poll(self, source, mounts):
+        """Requête du serveur dans un thread, sauf si la précédente est encore en cours"""
+        pending = self._pending.get(source)
+        if pending is not None and not pending.done():
+            raise TimeoutError("interrogation précédente toujours en cours")
+        task = self._pending[source] = asyncio.ensure_future(asyncio.to_thread(self.online_mounts, source, mounts))
+        # Résultat relevé même si l'échantillon a été abandonné entre-temps
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        # Une annulation (wait_for du monitoring) ne libère pas la connexion : la tâche reste suivie jusqu'au retour du thread
+        return await asyncio.shield(task)
+
+    async def collect(self):
+        results = await asyncio.gather(
+            *(self.poll(source, mounts) for source, mounts in self.servers),
+            return_exceptions=True
+        )
+        expected = up = 0
+        stream_kbps = 0.0
+        for (source, mounts), result in zip(self.servers, results):
+            if isinstance(result, BaseException) and not isinstance(result, (OSError, http.client.HTTPException, ValueError)):
+                raise result
+            online = result if isinstance(result, dict) else {}
+            expected += len(mounts) if mounts else 1
+            up += len(online) if mounts else int(bool(online))
+            stream_kbps += sum(
+                float(stats.get('audio_bitrate') or stats.get('bitrate') or 0) * int(stats.get('listeners', 0))
+                for stats in online.values()
+            )
+        return {'stream_quality': 100 * up / expected if expected else np.nan, 'stream_mbps': stream_kbps / 1000}
+
+    async def close(self):
+        for source, _ in self.servers:
+            source.close_connection()
+
+class SimulatedStreamCollector:
+    """Qualité de flux simulée, sans serveur Icecast configuré"""
+
+    async def collect(self):
+        return {'stream_quality': random.randint(97, 100)}
+
+    async def close(self):
+        pass
+
+class TransmitterProbe:
+    """Sonde d'un émetteur : connexion TCP, ou requête HEAD pour une URL http(s).
+
+    La sonde est bornée par `timeout` : un émetteur muet est compté hors ligne
+    sans retarder les autres sondes ni le rendu.
+    """
+
+    def __init__(self, name, url, timeout=2.0):
+        parts = urlsplit(url if '://' in url else f"tcp://{url}")
+        self.name = name
+        self.url = url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or {'http': 80, 'https': 443}.get(parts.scheme)
+        self.path = parts.path or '/'
+        self.timeout = timeout
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.scheme == 'https' or None)
+        try:
+            if self.scheme in ('http', 'https'):
+                writer.write(
+                    f"HEAD {self.path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n\r\n".encode('ascii')
+                )
+                await writer.drain()
+                status_line = await reader.readline()
+                parts = status_line.split()
+                if len(parts) < 2 or not parts[1].isdigit():
+                    raise ValueError("réponse HTTP invalide")
+                if int(parts[1]) >= 500:
+                    raise ValueError(f"HTTP {int(parts[1])}")
+        finally:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+    async def probe(self):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.connect(), self.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError) as error:
+            return {'name': self.name, 'ok': False, 'latency_ms': None,
+                    'error': str(error) or type(error).__name__}
+        return {'name': self.name, 'ok': True, 'latency_ms': (time.perf_counter() - start) * 1000, 'error': None}
+
+class SimulatedTransmitterProbe:
+    """Émetteur simulé (toujours en ligne, latence aléatoire)"""
+
+    def __init__(self, name):
+        self.name = name
+
+    async def probe(self):
+        return {'name': self.name, 'ok': True, 'latency_ms': float(random.randint(40, 120)), 'error': None}
+
+class TechMonitor:
+    """Échantillons du monitoring technique, pris à intervalle régulier.
+
+    Collecteurs et sondes tournent en parallèle dans la boucle du store, chacun
+    borné par `timeout`. Chaque échantillon est gardé dans un petit tampon
+    circulaire (`history`) ; `samples` contient le dernier et le précédent,
+    publiés ensemble par simple réaffectation pour les lecteurs des autres
+    threads. Les fonctions de `on_sample` reçoivent chaque nouvel échantillon ;
+    `version` compte les échantillons publiés (clé de cache de l'API).
+    """
+
+    def __init__(self, collectors=(), probes=(), interval=10, timeout=3.0, capacity=360):
+        self.collectors = list(collectors)
+        self.probes = list(probes)
+        self.interval = interval
+        self.timeout = timeout
+        self.history = AudienceRingBuffer(capacity, columns=TECH_COLUMNS, dtype=np.float64)
+        self.samples = (None, None)
+        self.version = 0
+        self.on_sample = []
+
+    @property
+    def latest(self):
+        return self.samples[1]
+
+    async def sample(self):
+        """Prend un échantillon de toutes les sources et le publie"""
+        results = await asyncio.gather(
+            *(asyncio.wait_for(collector.collect(), self.timeout) for collector in self.collectors),
+            *(asyncio.wait_for(probe.probe(), self.timeout + 1) for probe in self.probes),
+            return_exceptions=True
+        )
+        metrics = {}
+        for result in results[:len(self.collectors)]:
+            if isinstance(result, dict):
+                metrics.update(result)
+        transmitters = []
+        for probe, result in zip(self.probes, results[len(self.collectors):]):
+            if not isinstance(result, dict):
+                result = {'name': probe.name, 'ok': False, 'latency_ms': None, 'error': type(result).__name__}
+            transmitters.append(result)
+        if transmitters:
+            latencies = [transmitter['latency_ms'] for transmitter in transmitters if transmitter['ok']]
+            metrics['latency_ms'] = float(np.mean(latencies)) if latencies else np.nan
+            metrics['transmitters_up'] = len(latencies)
+
+        sample = dict(metrics, timestamp=datetime.now(), transmitters=transmitters,
+                      transmitters_total=len(transmitters))
+        self.history.append(sample['timestamp'], *(metrics.get(name, np.nan) for name in TECH_COLUMNS))
+        self.samples = (self.samples[1], sample)
+        self.version += 1
+        for callback in self.on_sample:
+            callback(sample)
+        return sample
+
+    async def run(self):
+        """Service du store (voir AudienceStore.services) : échantillonne jusqu'à l'annulation"""
+        try:
+            while True:
+                await self.sample()
+                await asyncio.sleep(self.interval)
+        finally:
+            for collector in self.collectors:
+                await collector.close()
+
+def parse_transmitters(value):
+    """« Nom=url, Nom2=hôte:port » vers [(nom, url)]"""
+    transmitters = []
+    for entry in value.split(','):
+        name, separator, url = entry.partition('=')
+        if not separator:
+            name, url = entry, entry
+        if url.strip():
+            transmitters.append((name.strip(), url.strip()))
+    return transmitters
+
+def build_tech_monitor():
+    """Monitoring technique selon l'environnement.
+
+    FREEDOM<n>_ICECAST_STATUS_URL / FREEDOM<n>_MOUNTS : points de montage suivis
+    FREEDOM_TRANSMITTERS : émetteurs sondés, ex. « Maïdo=tcp://10.0.0.5:22,Saint-Denis=http://10.0.1.2/ »
+    FREEDOM_TECH_INTERVAL : secondes entre deux échantillons (10 par défaut)
+    Sans serveur Icecast ni émetteurs configurés, flux et émetteurs sont simulés.
+    """
+    collectors = [HostCollector()]
+    servers = [
+        (os.environ[f"FREEDOM{number}_ICECAST_STATUS_URL"],
+         [mount.strip() for mount in os.environ.get(f"FREEDOM{number}_MOUNTS", '').split(',') if mount.strip()])
+        for number in STATIONS if os.environ.get(f"FREEDOM{number}_ICECAST_STATUS_URL")
+    ]
+    collectors.append(IcecastMountCollector(servers) if servers else SimulatedStreamCollector())
+
+    if os.environ.get('FREEDOM_TRANSMITTERS'):
+        probes = [TransmitterProbe(name, url) for name, url in parse_transmitters(os.environ['FREEDOM_TRANSMITTERS'])]
+    else:
+        probes = [SimulatedTransmitterProbe(f"Émetteur {number}") for number in range(1, SIMULATED_TRANSMITTERS + 1)]
+    return TechMonitor(collectors, probes, interval=float(os.environ.get('FREEDOM_TECH_INTERVAL', 10)))
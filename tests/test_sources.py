@@ -0,0 +1,222 @@
+"""Tests des sources d'audience réelles : status-json.xsl d'Icecast (serveur
+HTTP local de test) et suivi des logs (fichiers temporaires)."""
+import asyncio
+import http.server
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from freedom_audience import AccessLogSource, IcecastStatusSource, ListenerSessionSource, LogTailer
+
+class RecordingModel:
+    """Modèle minimal : garde ce que la source lui transmet"""
+
+    def __init__(self):
+        self.listeners = None
+        self.geo = None
+
+    def set_current_listeners(self, listeners):
+        self.listeners = listeners
+
+    def set_geo_data(self, commune_counts):
+        self.geo = commune_counts
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.clients.add(self.client_address)
+        status, body = self.server.response
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def status_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+    server.clients = set()
+    server.response = (200, b'{}')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def status_body(*mounts):
+    sources = [{'listenurl': f"http://radio:8000{mount}", 'listeners': listeners} for mount, listeners in mounts]
+    return json.dumps({'icestats': {'source': sources[0] if len(sources) == 1 else sources}}).encode()
+
+def status_source(server, **kwargs):
+    return IcecastStatusSource(f"http://127.0.0.1:{server.server_address[1]}/status-json.xsl", **kwargs)
+
+def test_status_sums_tracked_mounts(status_server):
+    status_server.response = (200, status_body(('/freedom1', 120), ('/freedom1.aac', 30), ('/freedom2', 80)))
+    source = status_source(status_server, mounts=['/freedom1', '/freedom1.aac'])
+    model = RecordingModel()
+    asyncio.run(source.update(model))
+    assert model.listeners == 150
+    asyncio.run(source.close())
+
+def test_status_single_mount_object(status_server):
+    status_server.response = (200, status_body(('/freedom1', 42)))
+    source = status_source(status_server)
+    model = RecordingModel()
+    asyncio.run(source.update(model))
+    assert model.listeners == 42
+
+def test_status_keeps_connection_alive(status_server):
+    status_server.response = (200, status_body(('/freedom1', 1)))
+    source = status_source(status_server)
+    source.fetch_status()
+    source.fetch_status()
+    assert len(status_server.clients) == 1
+    source.close_connection()
+
+@pytest.mark.parametrize('response', [(500, b'erreur'), (404, b''), (200, b'{pas du json')])
+def test_status_error_backs_off_and_keeps_value(status_server, response):
+    status_server.response = response
+    source = status_source(status_server, base_backoff=5.0)
+    model = RecordingModel()
+    before = time.monotonic()
+    asyncio.run(source.update(model))
+    assert model.listeners is None
+    assert source.failures == 1
+    assert source.last_error
+    assert source.next_attempt >= before + 2.5
+    # Pendant le backoff, aucune requête n'est faite
+    status_server.response = (200, status_body(('/freedom1', 7)))
+    asyncio.run(source.update(model))
+    assert model.listeners is None
+    # Après le backoff, le succès remet le compteur d'échecs à zéro
+    source.next_attempt = 0.0
+    asyncio.run(source.update(model))
+    assert model.listeners == 7
+    assert source.failures == 0
+
+def test_status_unreachable_server():
+    source = IcecastStatusSource('http://127.0.0.1:9/status-json.xsl', timeout=0.5)
+    model = RecordingModel()
+    asyncio.run(source.update(model))
+    assert model.listeners is None and source.failures == 1
+
+def test_tailer_starts_at_end_unless_from_start(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'ancienne\n')
+    assert LogTailer(str(path)).read_lines() == []
+    assert LogTailer(str(path), from_start=True).read_lines() == [b'ancienne']
+
+def test_tailer_keeps_partial_line(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'')
+    tailer = LogTailer(str(path))
+    tailer.read_lines()
+    with open(path, 'ab') as log_file:
+        log_file.write(b'une\ndeu')
+    assert tailer.read_lines() == [b'une']
+    with open(path, 'ab') as log_file:
+        log_file.write(b'x\n')
+    assert tailer.read_lines() == [b'deux']
+
+def test_tailer_follows_rotation(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'avant\n')
+    tailer = LogTailer(str(path), from_start=True)
+    assert tailer.read_lines() == [b'avant']
+    # logrotate : le fichier est renommé puis recréé (nouvel inode)
+    os.replace(path, tmp_path / 'access.log.1')
+    new_path = tmp_path / 'access.log.new'
+    new_path.write_bytes(b'apres rotation\n')
+    os.replace(new_path, path)
+    assert tailer.read_lines() == [b'apres rotation']
+
+def test_tailer_follows_truncation(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'ligne assez longue\n')
+    tailer = LogTailer(str(path), from_start=True)
+    tailer.read_lines()
+    # copytruncate : même inode, taille inférieure à l'offset
+    path.write_bytes(b'court\n')
+    assert tailer.read_lines() == [b'court']
+
+def test_tailer_reads_by_bounded_chunks(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b''.join(b'ligne %d\n' % i for i in range(100)))
+    tailer = LogTailer(str(path), from_start=True)
+    lines = []
+    while not tailer.caught_up or not lines:
+        lines += tailer.read_lines(max_bytes=64)
+    assert lines == [b'ligne %d' % i for i in range(100)]
+
+def access_line(ip, moment, path='/freedom1/segment.ts', status=200, duration=None):
+    stamp = moment.strftime('%d/%b/%Y:%H:%M:%S %z')
+    line = f'{ip} - - [{stamp}] "GET {path} HTTP/1.1" {status} 1024 "-" "VLC"'
+    return (line + (f' {duration}' if duration is not None else '')).encode()
+
+def test_access_log_counts_active_clients(tmp_path):
+    now = datetime.now(timezone.utc)
+    lines = [
+        access_line('10.0.0.1', now - timedelta(seconds=5)),                      # segment HLS récent
+        access_line('10.0.0.2', now - timedelta(seconds=5), duration=0.2),
+        access_line('10.0.0.3', now - timedelta(seconds=300)),                    # segment trop ancien
+        access_line('10.0.0.4', now - timedelta(seconds=5), duration=3600),       # connexion longue terminée
+        access_line('10.0.0.5', now - timedelta(seconds=5), status=404),
+        access_line('10.0.0.6', now - timedelta(seconds=5), path='/autre/segment.ts'),
+        b'ligne illisible',
+    ]
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'\n'.join(lines) + b'\n')
+    source = AccessLogSource(str(path), mounts=['/freedom1'], from_start=True)
+    source.ingest(source.tailer.read_lines())
+    assert sorted(source.active_clients(now.timestamp())) == ['10.0.0.1', '10.0.0.2']
+    # Sans nouveau segment, les clients sortent de la fenêtre d'écoute
+    assert source.active_clients(now.timestamp() + 120) == []
+
+def test_access_log_update_sets_listeners(tmp_path):
+    path = tmp_path / 'access.log'
+    path.write_bytes(b'')
+    source = AccessLogSource(str(path))
+    model = RecordingModel()
+    asyncio.run(source.update(model))
+    now = datetime.now(timezone.utc)
+    with open(path, 'ab') as log_file:
+        log_file.write(access_line('10.0.0.1', now) + b'\n' + access_line('10.0.0.2', now)[:20])
+    asyncio.run(source.update(model))
+    assert model.listeners == 1
+
+def test_session_log_callbacks(tmp_path):
+    path = tmp_path / 'sessions.log'
+    path.write_bytes(
+        b'action=listener_add&server=radio&port=8000&client=10&mount=%2Ffreedom1&user=&pass=&ip=10.0.0.1&agent=VLC\n'
+        b'action=listener_add&server=radio&port=8000&client=11&mount=%2Ffreedom1&user=&pass=&ip=10.0.0.2&agent=VLC\n'
+        b'action=listener_add&server=radio&port=8000&client=12&mount=%2Fautre&user=&pass=&ip=10.0.0.3&agent=VLC\n'
+        b'listener_add\n'
+        b'action=listener_remove&server=radio&port=8000&client=10&mount=%2Ffreedom1&user=&pass=&duration=60&ip=10.0.0.1\n'
+    )
+    source = ListenerSessionSource(str(path), ['Saint-Denis'], mounts=['/freedom1'])
+    source.read_pending()
+    assert source.listeners == 1 and list(source.sessions) == [b'11']
+
+def test_session_log_expires_and_resets(tmp_path):
+    path = tmp_path / 'sessions.log'
+    old = (datetime.now() - timedelta(days=2)).isoformat(timespec='seconds')
+    path.write_bytes(
+        f'{old} listener_add client=500 ip=10.0.0.1 mount=/freedom1\n'.encode()
+        + b'listener_add client=501 ip=10.0.0.2 mount=/freedom1\n'
+    )
+    source = ListenerSessionSource(str(path), ['Saint-Denis'])
+    source.read_pending()
+    assert list(source.sessions) == [b'501']
+    # Redémarrage d'Icecast : les identifiants de client repartent de 1
+    with open(path, 'ab') as log_file:
+        log_file.write(b'listener_add client=1 ip=10.0.0.3 mount=/freedom1\n')
+    source.read_pending()
+    assert list(source.sessions) == [b'1'] and source.listeners == 1